@@ -19,6 +19,10 @@ elif platform == "win32":
 
 import threading
 import enum
+import os as _os
+from array import array as _array
+import json as _json
+import math as _math
 
 # might be cheaper to just allocate new strings, TODO benchmark.
 def _check_errors():
@@ -29,6 +33,53 @@ def _check_errors():
         _lib.bc_free_string(_lasterror[0])
         raise Exception(errtext)
 
+# Native objects of collected wrappers wait here until the end of the turn while the arena is on, see set_turn_arena
+_arena = None
+
+
+def _free(delete, ptr):
+    # Called by the wrappers' __del__, the wrapper is gone so nothing can reach the native object any more
+    if _arena is None:
+        delete(ptr)
+        _check_errors()
+    else:
+        _arena.append((delete, ptr))
+
+
+def set_turn_arena(enabled):
+    # type: (bool) -> None
+    '''With the arena on, the native objects of the wrappers collected during a turn are not freed one by one from
+    __del__ but all together when the turn ends, see free_turn_arena. Only the natives of wrappers Python already
+    collected are deferred, so a wrapper kept for a later turn stays valid and nothing has to be marked to keep it.
+    Turning the arena off frees what it holds.
+    :type enabled: bool
+    :rtype: None
+    '''
+    global _arena
+    if enabled:
+        if _arena is None:
+            _arena = []
+    else:
+        free_turn_arena()
+        _arena = None
+
+
+def free_turn_arena():
+    # type: () -> int
+    '''Frees the native objects the arena holds in one pass with a single error check, GameController.next_turn calls
+    it before sending the turn. Returns how many objects were freed.
+    :rtype: int
+    '''
+    if not _arena:
+        return 0
+    pending = _arena[:]
+    del _arena[:len(pending)]
+    for delete, ptr in pending:
+        delete(ptr)
+    _check_errors()
+    return len(pending)
+
+
 def game_turns():
     """Usage:
     for controller in game_turns():
@@ -221,8 +272,31 @@ class Direction(enum.IntEnum):
         result = _result.decode()
         return result
 
+# (dx, dy) of every Direction, in the order of its values
+_DIRECTION_OFFSETS = [(0, 1), (1, 1), (1, 0), (1, -1), (0, -1), (-1, -1), (-1, 0), (-1, 1), (0, 0)]
+# Planet overrides __eq__ with an engine call, the members are singletons so locations compare them with is
+# Directions of the eight 45 degree sectors around a location, counterclockwise from East
+_SECTOR_DIRECTIONS = [Direction.East, Direction.Northeast, Direction.North, Direction.Northwest,
+                      Direction.West, Direction.Southwest, Direction.South, Direction.Southeast]
+_PLANETS = [Planet.Earth, Planet.Mars]
+_MAX_DISTANCE_SQUARED = 2 ** 32 - 1
+
+
+def _map_location(planet, x, y):
+    # Skips the argument asserts of the constructor, for locations computed from valid ones
+    location = MapLocation.__new__(MapLocation)
+    location._planet = planet
+    location._x = x
+    location._y = y
+    location._native = None
+    return location
+
+
 class MapLocation(object):
-    __slots__ = ['_ptr']
+    '''A location on a planet, kept in Python. It is immutable and hashable, the geometry is computed in Python
+    and the native location is only allocated when the location is passed to the engine, see _ptr.
+    '''
+    __slots__ = ['_planet', '_x', '_y', '_native']
     def __init__(self, planet, x, y):
         # type: (Planet, int, int) -> MapLocation
         '''Returns a new MapLocation representing the location with the given
@@ -237,21 +311,50 @@ class MapLocation(object):
         assert type(x) is int, "incorrect type of arg x: should be int, is {}".format(type(x))
         assert type(y) is int, "incorrect type of arg y: should be int, is {}".format(type(y))
 
-        ptr = _lib.new_bc_MapLocation(planet, x, y)
-        if ptr != _ffi.NULL: self._ptr = ptr
-        _check_errors()
+        self._planet = planet
+        self._x = x
+        self._y = y
+        self._native = None
 
     def __del__(self):
         # type: () -> None
-        '''Clean up the object.
+        '''Clean up the native location, if one was allocated.
         :type self: MapLocation
         :rtype: None
         '''
 
-        if hasattr(self, '_ptr'):
-            # if there was an error in the constructor, we'll have no _ptr
-            _lib.delete_bc_MapLocation(self._ptr)
+        native = getattr(self, '_native', None)
+        if native is not None:
+            _free(_lib.delete_bc_MapLocation, native)
+
+    @property
+    def _ptr(self):
+        # type: () -> object
+        '''The native location, allocated on first use and kept until the location is collected.
+        :type self: MapLocation
+        :rtype: object
+        '''
+
+        if self._native is None:
+            self._native = _lib.new_bc_MapLocation(self._planet, self._x, self._y)
             _check_errors()
+        return self._native
+
+    @_ptr.setter
+    def _ptr(self, ptr):
+        # type: (object) -> None
+        '''Takes over a native location returned by the engine, its coordinates are read once.
+        :type self: MapLocation
+        :type ptr: object
+        :rtype: None
+        '''
+
+        self._planet = _PLANETS[_lib.bc_MapLocation_planet_get(ptr)]
+        self._x = _lib.bc_MapLocation_x_get(ptr)
+        self._y = _lib.bc_MapLocation_y_get(ptr)
+        self._native = ptr
+        _check_errors()
+
     @property
     def planet(self):
         # type: () -> Planet
@@ -260,10 +363,7 @@ class MapLocation(object):
         :rtype: Planet
         '''
 
-        result = _lib.bc_MapLocation_planet_get(self._ptr)
-        _check_errors()
-        result = Planet(result)
-        return result
+        return self._planet
 
     @property
     def x(self):
@@ -273,9 +373,7 @@ class MapLocation(object):
         :rtype: int
         '''
 
-        result = _lib.bc_MapLocation_x_get(self._ptr)
-        _check_errors()
-        return result
+        return self._x
 
     @property
     def y(self):
@@ -285,51 +383,7 @@ class MapLocation(object):
         :rtype: int
         '''
 
-        result = _lib.bc_MapLocation_y_get(self._ptr)
-        _check_errors()
-        return result
-
-    @planet.setter
-    def planet(self, planet):
-        # type: (Planet) -> None
-        '''The planet of the map location.
-        :type self: MapLocation
-        :type planet: Planet
-        :rtype: None
-        '''
-        assert type(planet) is Planet, "incorrect type of arg planet: should be Planet, is {}".format(type(planet))
-
-        result = _lib.bc_MapLocation_planet_set(self._ptr, planet)
-        _check_errors()
-        return result
-
-    @x.setter
-    def x(self, x):
-        # type: (int) -> None
-        '''The x coordinate of the map location.
-        :type self: MapLocation
-        :type x: int
-        :rtype: None
-        '''
-        assert type(x) is int, "incorrect type of arg x: should be int, is {}".format(type(x))
-
-        result = _lib.bc_MapLocation_x_set(self._ptr, x)
-        _check_errors()
-        return result
-
-    @y.setter
-    def y(self, y):
-        # type: (int) -> None
-        '''The y coordinate of the map location.
-        :type self: MapLocation
-        :type y: int
-        :rtype: None
-        '''
-        assert type(y) is int, "incorrect type of arg y: should be int, is {}".format(type(y))
-
-        result = _lib.bc_MapLocation_y_set(self._ptr, y)
-        _check_errors()
-        return result
+        return self._y
 
     def add(self, direction):
         # type: (Direction) -> MapLocation
@@ -340,13 +394,8 @@ class MapLocation(object):
         '''
         assert type(direction) is Direction, "incorrect type of arg direction: should be Direction, is {}".format(type(direction))
 
-        result = _lib.bc_MapLocation_add(self._ptr, direction)
-        _check_errors()
-        _result = MapLocation.__new__(MapLocation)
-        if result != _ffi.NULL:
-            _result._ptr = result
-        result = _result
-        return result
+        dx, dy = _DIRECTION_OFFSETS[direction]
+        return _map_location(self._planet, self._x + dx, self._y + dy)
 
     def subtract(self, direction):
         # type: (Direction) -> MapLocation
@@ -357,13 +406,8 @@ class MapLocation(object):
         '''
         assert type(direction) is Direction, "incorrect type of arg direction: should be Direction, is {}".format(type(direction))
 
-        result = _lib.bc_MapLocation_subtract(self._ptr, direction)
-        _check_errors()
-        _result = MapLocation.__new__(MapLocation)
-        if result != _ffi.NULL:
-            _result._ptr = result
-        result = _result
-        return result
+        dx, dy = _DIRECTION_OFFSETS[direction]
+        return _map_location(self._planet, self._x - dx, self._y - dy)
 
     def add_multiple(self, direction, multiple):
         # type: (Direction, int) -> MapLocation
@@ -377,13 +421,8 @@ class MapLocation(object):
         assert type(direction) is Direction, "incorrect type of arg direction: should be Direction, is {}".format(type(direction))
         assert type(multiple) is int, "incorrect type of arg multiple: should be int, is {}".format(type(multiple))
 
-        result = _lib.bc_MapLocation_add_multiple(self._ptr, direction, multiple)
-        _check_errors()
-        _result = MapLocation.__new__(MapLocation)
-        if result != _ffi.NULL:
-            _result._ptr = result
-        result = _result
-        return result
+        dx, dy = _DIRECTION_OFFSETS[direction]
+        return _map_location(self._planet, self._x + dx * multiple, self._y + dy * multiple)
 
     def translate(self, dx, dy):
         # type: (int, int) -> MapLocation
@@ -397,13 +436,7 @@ class MapLocation(object):
         assert type(dx) is int, "incorrect type of arg dx: should be int, is {}".format(type(dx))
         assert type(dy) is int, "incorrect type of arg dy: should be int, is {}".format(type(dy))
 
-        result = _lib.bc_MapLocation_translate(self._ptr, dx, dy)
-        _check_errors()
-        _result = MapLocation.__new__(MapLocation)
-        if result != _ffi.NULL:
-            _result._ptr = result
-        result = _result
-        return result
+        return _map_location(self._planet, self._x + dx, self._y + dy)
 
     def distance_squared_to(self, o):
         # type: (MapLocation) -> int
@@ -415,9 +448,11 @@ class MapLocation(object):
         '''
         assert type(o) is MapLocation, "incorrect type of arg o: should be MapLocation, is {}".format(type(o))
 
-        result = _lib.bc_MapLocation_distance_squared_to(self._ptr, o._ptr)
-        _check_errors()
-        return result
+        if self._planet is not o._planet:
+            return _MAX_DISTANCE_SQUARED
+        dx = self._x - o._x
+        dy = self._y - o._y
+        return dx * dx + dy * dy
 
     def direction_to(self, o):
         # type: (MapLocation) -> Direction
@@ -431,10 +466,15 @@ class MapLocation(object):
         '''
         assert type(o) is MapLocation, "incorrect type of arg o: should be MapLocation, is {}".format(type(o))
 
-        result = _lib.bc_MapLocation_direction_to(self._ptr, o._ptr)
-        _check_errors()
-        result = Direction(result)
-        return result
+        if self._planet is not o._planet:
+            raise Exception(b'DifferentPlanet')
+        dx = o._x - self._x
+        dy = o._y - self._y
+        if dx == 0 and dy == 0:
+            return Direction.Center
+        # The sector boundaries lie at odd multiples of 22.5 degrees, no integer offset falls on one
+        sector = int((_math.atan2(dy, dx) / _math.pi * 4 + 8.5)) % 8
+        return _SECTOR_DIRECTIONS[sector]
 
     def is_adjacent_to(self, o):
         # type: (MapLocation) -> bool
@@ -448,10 +488,9 @@ class MapLocation(object):
         '''
         assert type(o) is MapLocation, "incorrect type of arg o: should be MapLocation, is {}".format(type(o))
 
-        result = _lib.bc_MapLocation_is_adjacent_to(self._ptr, o._ptr)
-        _check_errors()
-        result = bool(result)
-        return result
+        dx = self._x - o._x
+        dy = self._y - o._y
+        return self._planet is o._planet and 0 < dx * dx + dy * dy <= 2
 
     def is_within_range(self, range, o):
         # type: (int, MapLocation) -> bool
@@ -466,10 +505,9 @@ class MapLocation(object):
         assert type(range) is int, "incorrect type of arg range: should be int, is {}".format(type(range))
         assert type(o) is MapLocation, "incorrect type of arg o: should be MapLocation, is {}".format(type(o))
 
-        result = _lib.bc_MapLocation_is_within_range(self._ptr, range, o._ptr)
-        _check_errors()
-        result = bool(result)
-        return result
+        dx = self._x - o._x
+        dy = self._y - o._y
+        return self._planet is o._planet and dx * dx + dy * dy <= range
 
     def __repr__(self):
         # type: () -> str
@@ -478,12 +516,7 @@ class MapLocation(object):
         :rtype: str
         '''
 
-        result = _lib.bc_MapLocation_debug(self._ptr)
-        _check_errors()
-        _result = _ffi.string(result)
-        _lib.bc_free_string(result)
-        result = _result.decode()
-        return result
+        return 'MapLocation {{ planet: {}, x: {}, y: {} }}'.format(self._planet.name, self._x, self._y)
 
     def clone(self):
         # type: () -> MapLocation
@@ -492,13 +525,7 @@ class MapLocation(object):
         :rtype: MapLocation
         '''
 
-        result = _lib.bc_MapLocation_clone(self._ptr)
-        _check_errors()
-        _result = MapLocation.__new__(MapLocation)
-        if result != _ffi.NULL:
-            _result._ptr = result
-        result = _result
-        return result
+        return _map_location(self._planet, self._x, self._y)
 
     def __eq__(self, other):
         # type: (MapLocation) -> bool
@@ -507,12 +534,19 @@ class MapLocation(object):
         :type other: MapLocation
         :rtype: bool
         '''
-        assert type(other) is MapLocation, "incorrect type of arg other: should be MapLocation, is {}".format(type(other))
+        if type(other) is not MapLocation:
+            return NotImplemented
 
-        result = _lib.bc_MapLocation_eq(self._ptr, other._ptr)
-        _check_errors()
-        result = bool(result)
-        return result
+        return self._x == other._x and self._y == other._y and self._planet is other._planet
+
+    def __hash__(self):
+        # type: () -> int
+        '''Hash of the planet and coordinates, so locations can be used in sets and as dictionary keys.
+        :type self: MapLocation
+        :rtype: int
+        '''
+
+        return (self._planet * 65536 + self._x) * 65536 + self._y
 
     @staticmethod
     def from_json(s):
@@ -523,13 +557,8 @@ class MapLocation(object):
         '''
         assert type(s) is str, "incorrect type of arg s: should be str, is {}".format(type(s))
 
-        result = _lib.bc_MapLocation_from_json(_ffi.new("char[]", s.encode()))
-        _check_errors()
-        _result = MapLocation.__new__(MapLocation)
-        if result != _ffi.NULL:
-            _result._ptr = result
-        result = _result
-        return result
+        data = _json.loads(s)
+        return MapLocation(Planet[data['planet']], data['x'], data['y'])
 
     def to_json(self):
         # type: () -> str
@@ -538,12 +567,7 @@ class MapLocation(object):
         :rtype: str
         '''
 
-        result = _lib.bc_MapLocation_to_json(self._ptr)
-        _check_errors()
-        _result = _ffi.string(result)
-        _lib.bc_free_string(result)
-        result = _result.decode()
-        return result
+        return _json.dumps({'planet': self._planet.name, 'x': self._x, 'y': self._y}, separators=(',', ':'))
 
 
 
@@ -569,8 +593,7 @@ class VecMapLocation(object):
 
         if hasattr(self, '_ptr'):
             # if there was an error in the constructor, we'll have no _ptr
-            _lib.delete_bc_VecMapLocation(self._ptr)
-            _check_errors()
+            _free(_lib.delete_bc_VecMapLocation, self._ptr)
 
 
     def __repr__(self):
@@ -660,8 +683,7 @@ class Veci32(object):
 
         if hasattr(self, '_ptr'):
             # if there was an error in the constructor, we'll have no _ptr
-            _lib.delete_bc_Veci32(self._ptr)
-            _check_errors()
+            _free(_lib.delete_bc_Veci32, self._ptr)
 
 
     def __repr__(self):
@@ -745,8 +767,7 @@ class Location(object):
 
         if hasattr(self, '_ptr'):
             # if there was an error in the constructor, we'll have no _ptr
-            _lib.delete_bc_Location(self._ptr)
-            _check_errors()
+            _free(_lib.delete_bc_Location, self._ptr)
 
 
     @staticmethod
@@ -1047,8 +1068,7 @@ class Player(object):
 
         if hasattr(self, '_ptr'):
             # if there was an error in the constructor, we'll have no _ptr
-            _lib.delete_bc_Player(self._ptr)
-            _check_errors()
+            _free(_lib.delete_bc_Player, self._ptr)
     @property
     def team(self):
         # type: () -> Team
@@ -1204,8 +1224,7 @@ class VecUnitID(object):
 
         if hasattr(self, '_ptr'):
             # if there was an error in the constructor, we'll have no _ptr
-            _lib.delete_bc_VecUnitID(self._ptr)
-            _check_errors()
+            _free(_lib.delete_bc_VecUnitID, self._ptr)
 
 
     def __repr__(self):
@@ -1375,8 +1394,7 @@ class VecUnitType(object):
 
         if hasattr(self, '_ptr'):
             # if there was an error in the constructor, we'll have no _ptr
-            _lib.delete_bc_VecUnitType(self._ptr)
-            _check_errors()
+            _free(_lib.delete_bc_VecUnitType, self._ptr)
 
 
     def __repr__(self):
@@ -1461,8 +1479,7 @@ class Unit(object):
 
         if hasattr(self, '_ptr'):
             # if there was an error in the constructor, we'll have no _ptr
-            _lib.delete_bc_Unit(self._ptr)
-            _check_errors()
+            _free(_lib.delete_bc_Unit, self._ptr)
 
 
     def __repr__(self):
@@ -2087,8 +2104,7 @@ class VecUnit(object):
 
         if hasattr(self, '_ptr'):
             # if there was an error in the constructor, we'll have no _ptr
-            _lib.delete_bc_VecUnit(self._ptr)
-            _check_errors()
+            _free(_lib.delete_bc_VecUnit, self._ptr)
 
 
     def __repr__(self):
@@ -2176,8 +2192,7 @@ class PlanetMap(object):
 
         if hasattr(self, '_ptr'):
             # if there was an error in the constructor, we'll have no _ptr
-            _lib.delete_bc_PlanetMap(self._ptr)
-            _check_errors()
+            _free(_lib.delete_bc_PlanetMap, self._ptr)
     @property
     def planet(self):
         # type: () -> Planet
@@ -2347,6 +2362,28 @@ class PlanetMap(object):
         _check_errors()
         return result
 
+    def passable_grid(self):
+        # type: () -> bytearray
+        '''The passable terrain of the whole map in one call, 1 for passable and 0 for impassable squares,
+        the square (x, y) is at index y * width + x.
+        :type self: PlanetMap
+        :rtype: bytearray
+        '''
+
+        rows = _json.loads(self.to_json())['is_passable_terrain']
+        return bytearray(1 if passable else 0 for row in rows for passable in row)
+
+    def initial_karbonite_grid(self):
+        # type: () -> array
+        '''The karbonite initially deposited on the whole map in one call, as an array of int32,
+        the square (x, y) is at index y * width + x.
+        :type self: PlanetMap
+        :rtype: array
+        '''
+
+        rows = _json.loads(self.to_json())['initial_karbonite']
+        return _array('i', [amount for row in rows for amount in row])
+
     def clone(self):
         # type: () -> PlanetMap
         '''Deep-copy a PlanetMap
@@ -2417,8 +2454,7 @@ class Delta(object):
 
         if hasattr(self, '_ptr'):
             # if there was an error in the constructor, we'll have no _ptr
-            _lib.delete_bc_Delta(self._ptr)
-            _check_errors()
+            _free(_lib.delete_bc_Delta, self._ptr)
 
 
     @staticmethod
@@ -2476,8 +2512,7 @@ class StartGameMessage(object):
 
         if hasattr(self, '_ptr'):
             # if there was an error in the constructor, we'll have no _ptr
-            _lib.delete_bc_StartGameMessage(self._ptr)
-            _check_errors()
+            _free(_lib.delete_bc_StartGameMessage, self._ptr)
 
 
     @staticmethod
@@ -2535,8 +2570,7 @@ class TurnMessage(object):
 
         if hasattr(self, '_ptr'):
             # if there was an error in the constructor, we'll have no _ptr
-            _lib.delete_bc_TurnMessage(self._ptr)
-            _check_errors()
+            _free(_lib.delete_bc_TurnMessage, self._ptr)
 
 
     @staticmethod
@@ -2594,8 +2628,7 @@ class StartTurnMessage(object):
 
         if hasattr(self, '_ptr'):
             # if there was an error in the constructor, we'll have no _ptr
-            _lib.delete_bc_StartTurnMessage(self._ptr)
-            _check_errors()
+            _free(_lib.delete_bc_StartTurnMessage, self._ptr)
     @property
     def time_left_ms(self):
         # type: () -> int
@@ -2703,8 +2736,7 @@ class ViewerMessage(object):
 
         if hasattr(self, '_ptr'):
             # if there was an error in the constructor, we'll have no _ptr
-            _lib.delete_bc_ViewerMessage(self._ptr)
-            _check_errors()
+            _free(_lib.delete_bc_ViewerMessage, self._ptr)
 
 
     @staticmethod
@@ -2762,8 +2794,7 @@ class ViewerKeyframe(object):
 
         if hasattr(self, '_ptr'):
             # if there was an error in the constructor, we'll have no _ptr
-            _lib.delete_bc_ViewerKeyframe(self._ptr)
-            _check_errors()
+            _free(_lib.delete_bc_ViewerKeyframe, self._ptr)
 
 
     @staticmethod
@@ -2821,8 +2852,7 @@ class ErrorMessage(object):
 
         if hasattr(self, '_ptr'):
             # if there was an error in the constructor, we'll have no _ptr
-            _lib.delete_bc_ErrorMessage(self._ptr)
-            _check_errors()
+            _free(_lib.delete_bc_ErrorMessage, self._ptr)
     @property
     def error(self):
         # type: () -> str
@@ -2921,8 +2951,7 @@ class ReceivedMessaTurnMessage(object):
 
         if hasattr(self, '_ptr'):
             # if there was an error in the constructor, we'll have no _ptr
-            _lib.delete_bc_ReceivedMessaTurnMessage(self._ptr)
-            _check_errors()
+            _free(_lib.delete_bc_ReceivedMessaTurnMessage, self._ptr)
 
 
     @staticmethod
@@ -2994,8 +3023,7 @@ class SentMessage(object):
 
         if hasattr(self, '_ptr'):
             # if there was an error in the constructor, we'll have no _ptr
-            _lib.delete_bc_SentMessage(self._ptr)
-            _check_errors()
+            _free(_lib.delete_bc_SentMessage, self._ptr)
     @property
     def client_id(self):
         # type: () -> str
@@ -3124,8 +3152,7 @@ class TurnApplication(object):
 
         if hasattr(self, '_ptr'):
             # if there was an error in the constructor, we'll have no _ptr
-            _lib.delete_bc_TurnApplication(self._ptr)
-            _check_errors()
+            _free(_lib.delete_bc_TurnApplication, self._ptr)
     @property
     def start_turn(self):
         # type: () -> StartTurnMessage
@@ -3237,8 +3264,7 @@ class InitialTurnApplication(object):
 
         if hasattr(self, '_ptr'):
             # if there was an error in the constructor, we'll have no _ptr
-            _lib.delete_bc_InitialTurnApplication(self._ptr)
-            _check_errors()
+            _free(_lib.delete_bc_InitialTurnApplication, self._ptr)
     @property
     def start_turn(self):
         # type: () -> StartTurnMessage
@@ -3328,8 +3354,7 @@ class AsteroidStrike(object):
 
         if hasattr(self, '_ptr'):
             # if there was an error in the constructor, we'll have no _ptr
-            _lib.delete_bc_AsteroidStrike(self._ptr)
-            _check_errors()
+            _free(_lib.delete_bc_AsteroidStrike, self._ptr)
     @property
     def karbonite(self):
         # type: () -> int
@@ -3488,8 +3513,7 @@ class AsteroidPattern(object):
 
         if hasattr(self, '_ptr'):
             # if there was an error in the constructor, we'll have no _ptr
-            _lib.delete_bc_AsteroidPattern(self._ptr)
-            _check_errors()
+            _free(_lib.delete_bc_AsteroidPattern, self._ptr)
 
 
     def validate(self):
@@ -3631,8 +3655,7 @@ class OrbitPattern(object):
 
         if hasattr(self, '_ptr'):
             # if there was an error in the constructor, we'll have no _ptr
-            _lib.delete_bc_OrbitPattern(self._ptr)
-            _check_errors()
+            _free(_lib.delete_bc_OrbitPattern, self._ptr)
     @property
     def amplitude(self):
         # type: () -> int
@@ -3793,8 +3816,7 @@ class GameMap(object):
 
         if hasattr(self, '_ptr'):
             # if there was an error in the constructor, we'll have no _ptr
-            _lib.delete_bc_GameMap(self._ptr)
-            _check_errors()
+            _free(_lib.delete_bc_GameMap, self._ptr)
     @property
     def seed(self):
         # type: () -> int
@@ -4082,8 +4104,7 @@ class ResearchInfo(object):
 
         if hasattr(self, '_ptr'):
             # if there was an error in the constructor, we'll have no _ptr
-            _lib.delete_bc_ResearchInfo(self._ptr)
-            _check_errors()
+            _free(_lib.delete_bc_ResearchInfo, self._ptr)
 
 
     def get_level(self, branch):
@@ -4213,8 +4234,7 @@ class RocketLanding(object):
 
         if hasattr(self, '_ptr'):
             # if there was an error in the constructor, we'll have no _ptr
-            _lib.delete_bc_RocketLanding(self._ptr)
-            _check_errors()
+            _free(_lib.delete_bc_RocketLanding, self._ptr)
     @property
     def rocket_id(self):
         # type: () -> int
@@ -4369,8 +4389,7 @@ class VecRocketLanding(object):
 
         if hasattr(self, '_ptr'):
             # if there was an error in the constructor, we'll have no _ptr
-            _lib.delete_bc_VecRocketLanding(self._ptr)
-            _check_errors()
+            _free(_lib.delete_bc_VecRocketLanding, self._ptr)
 
 
     def __repr__(self):
@@ -4458,8 +4477,7 @@ class RocketLandingInfo(object):
 
         if hasattr(self, '_ptr'):
             # if there was an error in the constructor, we'll have no _ptr
-            _lib.delete_bc_RocketLandingInfo(self._ptr)
-            _check_errors()
+            _free(_lib.delete_bc_RocketLandingInfo, self._ptr)
 
 
     def landings_on(self, round):
@@ -4555,6 +4573,162 @@ class RocketLandingInfo(object):
 
 
 
+class UnitsArray(object):
+    '''Units as columns of int32 values, entry i of every column describes the same unit.
+    The columns are array.array('i') buffers, so memoryview(columns.x) or numpy.frombuffer(columns.x, 'i4')
+    read them without copying. Units that are not on a map have x, y and planet set to -1, structures
+    have no heat and keep 0 in the heat columns.
+    '''
+    __slots__ = ['count', 'id', 'team', 'unit_type', 'x', 'y', 'planet', 'health', 'movement_heat', 'attack_heat',
+                 'in_garrison']
+
+    def __init__(self, count):
+        # type: (int) -> UnitsArray
+        '''Allocates zeroed columns for count units.
+        :type self: UnitsArray
+        :type count: int
+        :rtype: UnitsArray
+        '''
+        assert type(count) is int, "incorrect type of arg count: should be int, is {}".format(type(count))
+
+        self.count = count
+        for column in UnitsArray.__slots__[1:]:
+            setattr(self, column, _array('i', bytes(4 * count)))
+
+    def __len__(self):
+        # type: () -> int
+        return self.count
+
+    def __repr__(self):
+        # type: () -> str
+        return 'UnitsArray(count={})'.format(self.count)
+
+
+def _units_array_from_vec(vec):
+    # The native vector is read with the raw library calls, no Unit, Location or MapLocation wrappers are
+    # created and the error flag is checked once at the end instead of after every call.
+    lib = _lib
+    count = lib.bc_VecUnit_len(vec)
+    result = UnitsArray(count)
+    ids = result.id
+    teams = result.team
+    unit_types = result.unit_type
+    xs = result.x
+    ys = result.y
+    planets = result.planet
+    healths = result.health
+    movement_heats = result.movement_heat
+    attack_heats = result.attack_heat
+    in_garrison = result.in_garrison
+    first_structure = int(UnitType.Factory)
+    for i in range(count):
+        unit = lib.bc_VecUnit_index(vec, i)
+        ids[i] = lib.bc_Unit_id(unit)
+        teams[i] = lib.bc_Unit_team(unit)
+        unit_type = lib.bc_Unit_unit_type(unit)
+        unit_types[i] = unit_type
+        healths[i] = lib.bc_Unit_health(unit)
+        if unit_type < first_structure:
+            movement_heats[i] = lib.bc_Unit_movement_heat(unit)
+            attack_heats[i] = lib.bc_Unit_attack_heat(unit)
+        location = lib.bc_Unit_location(unit)
+        if lib.bc_Location_is_on_map(location):
+            map_location = lib.bc_Location_map_location(location)
+            xs[i] = lib.bc_MapLocation_x_get(map_location)
+            ys[i] = lib.bc_MapLocation_y_get(map_location)
+            planets[i] = lib.bc_MapLocation_planet_get(map_location)
+            lib.delete_bc_MapLocation(map_location)
+        else:
+            xs[i] = -1
+            ys[i] = -1
+            planets[i] = -1
+            in_garrison[i] = lib.bc_Location_is_in_garrison(location)
+        lib.delete_bc_Location(location)
+        lib.delete_bc_Unit(unit)
+    _check_errors()
+    return result
+
+_UNIT_TYPE_COSTS = ['factory_cost', 'blueprint_cost', 'replicate_cost', 'value']
+_UNIT_LEVEL_STATS = ['max_health', 'defense', 'vision_range', 'movement_cooldown', 'attack_range', 'attack_cooldown',
+                     'damage', 'cannot_attack_range', 'ability_cooldown', 'ability_range', 'is_ability_unlocked',
+                     'harvest_amount', 'build_health', 'repair_health', 'self_heal_amount', 'blast_damage',
+                     'max_capacity', 'travel_time_decrease', 'factory_max_rounds_left', 'max_countdown']
+
+
+class UnitTypeStats(object):
+    '''The stats of a unit type at a research level as plain attributes, named like the Unit and UnitType methods.
+    The costs are read with the row and are None for the types the engine has no such cost for. The other stats
+    are read from one of our units of the type and level the first time one of them is read, and are None while
+    we have no such unit.
+    '''
+    __slots__ = ['unit_type', 'level', '_controller'] + _UNIT_TYPE_COSTS + _UNIT_LEVEL_STATS
+
+    def __init__(self, unit_type, level):
+        # type: (UnitType, int) -> UnitTypeStats
+        '''Reads the costs of the unit type, the level stats are left unread.
+        :type self: UnitTypeStats
+        :type unit_type: UnitType
+        :type level: int
+        :rtype: UnitTypeStats
+        '''
+
+        self.unit_type = unit_type
+        self.level = level
+        for name in _UNIT_TYPE_COSTS:
+            try:
+                value = getattr(_lib, 'bc_UnitType_' + name)(unit_type)
+                _check_errors()
+            except Exception:
+                # InappropriateUnitType, e.g. the factory cost of a structure
+                value = None
+            setattr(self, name, value)
+        # The controller to look for units of the type with, set by GameController.unit_type_stats
+        self._controller = None
+
+    def __getattr__(self, name):
+        # type: (str) -> object
+        # Only called for the slots not set yet, which are the level stats before a unit was read
+        if name not in _UNIT_LEVEL_STATS:
+            raise AttributeError(name)
+        if self._controller is not None and self not in _unseen_stats:
+            for unit in self._controller.my_units():
+                if unit.unit_type == self.unit_type and unit.research_level == self.level:
+                    self.read_unit(_json.loads(unit.to_json()))
+                    return getattr(self, name)
+            _unseen_stats.add(self)
+        return None
+
+    def read_unit(self, data):
+        # type: (dict) -> None
+        '''Fills in the level stats from the decoded to_json of a unit of this type and level.
+        :type self: UnitTypeStats
+        :type data: dict
+        :rtype: None
+        '''
+
+        for name in _UNIT_LEVEL_STATS:
+            setattr(self, name, data.get(name))
+
+    def __repr__(self):
+        # type: () -> str
+        return 'UnitTypeStats({}, level={})'.format(self.unit_type.name, self.level)
+
+
+# (unit type, research level) -> stats, the stats only change with the level so the rows are kept for the game
+_unit_type_stats = dict()
+# Unit type -> research level of our team this turn, cleared by GameController.next_turn
+_research_levels = dict()
+# Rows no unit of ours could fill this turn, so they are not searched for again until the next turn
+_unseen_stats = set()
+
+
+def _stats_row(unit_type, level):
+    key = (int(unit_type), level)
+    stats = _unit_type_stats.get(key)
+    if stats is None:
+        stats = _unit_type_stats[key] = UnitTypeStats(UnitType(unit_type), level)
+    return stats
+
 class GameController(object):
     __slots__ = ['_ptr']
     def __init__(self):
@@ -4588,8 +4762,11 @@ class GameController(object):
         :rtype: None
         '''
 
+        free_turn_arena()
         result = _lib.bc_GameController_next_turn(self._ptr)
         _check_errors()
+        _research_levels.clear()
+        _unseen_stats.clear()
         return result
 
     def get_time_left_ms(self):
@@ -4715,6 +4892,23 @@ class GameController(object):
         result = _result
         return result
 
+    def units_array(self):
+        # type: () -> UnitsArray
+        '''All the units within the vision range as int32 columns, in no particular order. Does not include units in space.
+        Much cheaper than iterating units() when only the ids, types, positions, health and heats are needed.
+        :type self: GameController
+        :rtype: UnitsArray
+        '''
+
+        vec = _lib.bc_GameController_units(self._ptr)
+        _check_errors()
+        try:
+            result = _units_array_from_vec(vec)
+        finally:
+            _lib.delete_bc_VecUnit(vec)
+        _check_errors()
+        return result
+
     def units_in_space(self):
         # type: () -> VecUnit
         '''All the units of this team that are in space. You cannot see units on the other team that are in space.
@@ -4746,6 +4940,36 @@ class GameController(object):
         _check_errors()
         return result
 
+    def karbonite_grid(self):
+        # type: () -> array
+        '''The karbonite on every square of the current planet in one call, as an array of int32 with the square (x, y)
+        at index y * width + x. Squares outside the vision range are -1.
+        :type self: GameController
+        :rtype: array
+        '''
+
+        lib = _lib
+        planet = lib.bc_GameController_planet(self._ptr)
+        planet_map = lib.bc_GameController_starting_map(self._ptr, planet)
+        width = lib.bc_PlanetMap_width_get(planet_map)
+        height = lib.bc_PlanetMap_height_get(planet_map)
+        lib.delete_bc_PlanetMap(planet_map)
+        _check_errors()
+        result = _array('i', [-1]) * (width * height)
+        # One native location is moved over the map instead of allocating one per square
+        location = lib.new_bc_MapLocation(planet, 0, 0)
+        try:
+            for y in range(height):
+                lib.bc_MapLocation_y_set(location, y)
+                for x in range(width):
+                    lib.bc_MapLocation_x_set(location, x)
+                    if lib.bc_GameController_can_sense_location(self._ptr, location):
+                        result[y * width + x] = lib.bc_GameController_karbonite_at(self._ptr, location)
+        finally:
+            lib.delete_bc_MapLocation(location)
+        _check_errors()
+        return result
+
     def all_locations_within(self, location, radius_squared):
         # type: (MapLocation, int) -> VecMapLocation
         '''Returns an array of all locations within a certain radius squared of this location that are on the map.
@@ -5124,6 +5348,24 @@ class GameController(object):
         result = _result
         return result
 
+    def unit_type_stats(self, unit_type):
+        # type: (UnitType) -> UnitTypeStats
+        '''The stats of the unit type at our current research level as plain attributes, without an engine call once
+        the row is known. The research levels are read once per turn. Our units are only searched when a level stat
+        is read, the costs never need them.
+        :type self: GameController
+        :type unit_type: UnitType
+        :rtype: UnitTypeStats
+        '''
+        assert type(unit_type) is UnitType, "incorrect type of arg unit_type: should be UnitType, is {}".format(type(unit_type))
+
+        level = _research_levels.get(unit_type)
+        if level is None:
+            level = _research_levels[unit_type] = self.research_info().get_level(unit_type)
+        stats = _stats_row(unit_type, level)
+        stats._controller = self
+        return stats
+
     def reset_research(self):
         # type: () -> bool
         '''Resets the research queue to be empty. Returns true if the queue was not empty before, and false otherwise.
@@ -5931,3 +6173,70 @@ class GameController(object):
         return result
 
 
+
+
+# Fast mode: the hot GameController methods below are swapped for versions without the type asserts, and the
+# queries only look at the error flag when they return false, because the native functions return zero when
+# they fail. So a true answer costs one FFI call instead of two. The actions still check the flag after every
+# call, a failed action has to raise before the bot acts on it.
+_FAST_QUERIES = ['is_move_ready', 'can_move', 'is_attack_ready', 'can_attack', 'can_harvest', 'can_build',
+                 'can_repair', 'can_replicate', 'is_javelin_ready', 'can_javelin', 'is_heal_ready', 'can_heal',
+                 'is_overcharge_ready', 'can_overcharge', 'can_load', 'can_unload', 'can_blueprint',
+                 'can_produce_robot', 'can_sense_unit']
+_FAST_ACTIONS = ['move_robot', 'attack', 'harvest', 'build', 'repair', 'replicate', 'javelin', 'heal',
+                 'overcharge', 'load', 'unload', 'blueprint', 'produce_robot']
+_checked_methods = {name: getattr(GameController, name) for name in _FAST_QUERIES + _FAST_ACTIONS}
+
+
+def _fast_query(name):
+    function = getattr(_lib, 'bc_GameController_' + name)
+
+    def query(self, *args):
+        result = function(self._ptr, *args)
+        if not result:
+            _check_errors()
+        return bool(result)
+    query.__name__ = name
+    query.__doc__ = _checked_methods[name].__doc__
+    return query
+
+
+def _fast_action(name):
+    function = getattr(_lib, 'bc_GameController_' + name)
+
+    def action(self, *args):
+        function(self._ptr, *args)
+        _check_errors()
+    action.__name__ = name
+    action.__doc__ = _checked_methods[name].__doc__
+    return action
+
+
+_fast_methods = dict([(name, _fast_query(name)) for name in _FAST_QUERIES] +
+                     [(name, _fast_action(name)) for name in _FAST_ACTIONS])
+
+
+def set_fast_mode(enabled):
+    # type: (bool) -> None
+    '''Switches the hot GameController methods (the can_*, is_*_ready checks and the unit actions taking ids and
+    directions) between the checked and the fast versions, no rebuild needed. The fast versions skip the argument
+    type asserts and the checks only read the error flag when they answer false. Set the BC_FAST_BINDINGS
+    environment variable to 1 to start in fast mode.
+    :type enabled: bool
+    :rtype: None
+    '''
+    methods = _fast_methods if enabled else _checked_methods
+    for name, method in methods.items():
+        setattr(GameController, name, method)
+
+
+def is_fast_mode():
+    # type: () -> bool
+    '''Whether the fast GameController methods are in place, see set_fast_mode.
+    :rtype: bool
+    '''
+    return GameController.move_robot is _fast_methods['move_robot']
+
+
+if _os.environ.get('BC_FAST_BINDINGS', '0') not in ('', '0'):
+    set_fast_mode(True)
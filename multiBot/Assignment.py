@@ -0,0 +1,79 @@
+from typing import List
+
+# Cost of a pair that must not be assigned, e.g. a task the worker cannot walk to
+INFEASIBLE = 10 ** 6
+
+
+def solve_assignment(costs):  # type: (List[List[int]]) -> List[int]
+    """
+    Hungarian algorithm, minimizes the total cost of assigning rows (workers) to columns (tasks) one to one.
+    Returns for every row the index of its column, or None when there are more rows than columns
+    or the only column left for the row is INFEASIBLE.
+    """
+    if len(costs) == 0:
+        return []
+    if len(costs[0]) == 0:
+        return [None] * len(costs)
+    if len(costs) > len(costs[0]):
+        # The algorithm assigns every row, so with more workers than tasks the tasks pick the workers
+        transposed = [list(column) for column in zip(*costs)]
+        result = [None] * len(costs)
+        for column, row in enumerate(hungarian(transposed)):
+            if transposed[column][row] < INFEASIBLE:
+                result[row] = column
+        return result
+    return [column if costs[row][column] < INFEASIBLE else None for row, column in enumerate(hungarian(costs))]
+
+
+def hungarian(costs):  # type: (List[List[int]]) -> List[int]
+    """
+    O(n^2 m) shortest augmenting path version for n <= m, returns the column of every row.
+    """
+    n = len(costs)
+    m = len(costs[0])
+    infinity = float('inf')
+    # Potentials of the rows and columns, index 0 is a virtual column
+    u = [0] * (n + 1)
+    v = [0] * (m + 1)
+    row_of_column = [0] * (m + 1)
+    way = [0] * (m + 1)
+    for row in range(1, n + 1):
+        row_of_column[0] = row
+        column = 0
+        min_slack = [infinity] * (m + 1)
+        used = [False] * (m + 1)
+        while True:
+            used[column] = True
+            current_row = row_of_column[column]
+            row_costs = costs[current_row - 1]
+            delta = infinity
+            next_column = 0
+            for j in range(1, m + 1):
+                if not used[j]:
+                    slack = row_costs[j - 1] - u[current_row] - v[j]
+                    if slack < min_slack[j]:
+                        min_slack[j] = slack
+                        way[j] = column
+                    if min_slack[j] < delta:
+                        delta = min_slack[j]
+                        next_column = j
+            for j in range(m + 1):
+                if used[j]:
+                    u[row_of_column[j]] += delta
+                    v[j] -= delta
+                else:
+                    min_slack[j] -= delta
+            column = next_column
+            if row_of_column[column] == 0:
+                break
+        # Flip the augmenting path
+        while column != 0:
+            previous = way[column]
+            row_of_column[column] = row_of_column[previous]
+            column = previous
+
+    result = [None] * n
+    for j in range(1, m + 1):
+        if row_of_column[j] != 0:
+            result[row_of_column[j] - 1] = j - 1
+    return result
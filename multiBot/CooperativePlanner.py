@@ -0,0 +1,115 @@
+from typing import List, Set, Tuple
+from FlowField import flow_fields, UNREACHABLE
+from Grid import Grid
+from GridSearch import TIE_BREAK
+from PriorityQueue import PriorityQueue
+
+# Number of turns every unit plans ahead and reserves in the space-time table
+WINDOW = 8
+# Expansion limit of a single space-time search, a unit that hits it waits this turn
+MAX_EXPANSIONS = 300
+
+
+class ReservationTable:
+    """
+    Cells and moves already claimed by planned units, indexed by the turn offset t.
+    """
+
+    def __init__(self) -> None:
+        self.cells = set()  # type: Set[Tuple[int, int]]
+        self.moves = set()  # type: Set[Tuple[int, int, int]]
+
+    def is_free(self, idx: int, t: int) -> bool:
+        return (idx, t) not in self.cells
+
+    def is_swap(self, from_idx: int, to_idx: int, t: int) -> bool:
+        return (to_idx, from_idx, t) in self.moves
+
+    def reserve_path(self, path: List[int], window: int) -> None:
+        for t, idx in enumerate(path):
+            self.cells.add((idx, t))
+            if t > 0:
+                self.moves.add((path[t - 1], idx, t))
+        for t in range(len(path), window + 1):
+            self.cells.add((path[-1], t))
+
+
+def plan_cooperative_moves(grid, requests, window=WINDOW):
+    # type: (Grid, List[Tuple[int, Tuple[int, int], Tuple[int, int]]], int) -> List[Tuple[int, Tuple[int, int], Tuple[int, int]]]
+    """
+    Windowed hierarchical cooperative A* for units moving in the same turn.
+    Requests are (unit id, position, goal), a unit arrives when it is next to its goal.
+    The true distance from the shared flow field of the goal is the heuristic, and every planned unit
+    reserves its cells for the next turns so the following units route around it instead of into it.
+    Returns (unit id, position, next cell or None) in the order the moves have to be executed.
+    """
+    table = ReservationTable()
+    fields = {goal: flow_fields.field(grid, goal) for _, _, goal in requests}
+
+    def distance_to_goal(request):
+        distance = fields[request[2]][grid.index(request[1][0], request[1][1])]
+        return distance if distance != UNREACHABLE else grid.width * grid.height
+
+    # Units closer to their goal plan and move first, so a column does not block itself
+    requests = sorted(requests, key=distance_to_goal)
+    dynamic = {grid.index(start[0], start[1]) for _, start, _ in requests}
+    # Until a unit is planned it may stay where it is
+    for idx in dynamic:
+        table.cells.add((idx, 1))
+
+    result = []
+    for unit_id, start, goal in requests:
+        start_idx = grid.index(start[0], start[1])
+        table.cells.discard((start_idx, 1))
+        path = space_time_search(grid, table, dynamic, fields[goal], start_idx, window)
+        if path is None:
+            path = [start_idx]
+        table.reserve_path(path, window)
+        next_node = grid.coords(path[1]) if len(path) > 1 and path[1] != start_idx else None
+        result.append((unit_id, start, next_node))
+    return result
+
+
+def space_time_search(grid, table, dynamic, field, start_idx, window):
+    # type: (Grid, ReservationTable, Set[int], List[int], int, int) -> List[int]
+    """
+    A* over (cell, turn) states where waiting is a move, until the unit is next to the goal or the window ends.
+    Returns the cells of the unit for turns 0, 1, ... or None when the search gives up.
+    """
+    size = grid.width * grid.height
+    neighbours = grid.neighbours
+    occupied = grid.occupied
+    if field[start_idx] == UNREACHABLE:
+        return None
+
+    frontier = PriorityQueue()
+    frontier.put(start_idx, field[start_idx])
+    came_from = {start_idx: None}
+    closed = set()
+
+    while not frontier.empty() and len(closed) < MAX_EXPANSIONS:
+        state = frontier.get()
+        idx, t = state % size, state // size
+        if field[idx] <= 1 or t == window:
+            path = []
+            while state is not None:
+                path.append(state % size)
+                state = came_from[state]
+            path.reverse()
+            return path
+        closed.add(state)
+
+        t1 = t + 1
+        for nxt in neighbours[idx] + [idx]:
+            nxt_state = t1 * size + nxt
+            estimate = field[nxt]
+            if (nxt_state in closed
+                    or estimate == UNREACHABLE
+                    or (occupied[nxt] and nxt not in dynamic)
+                    or not table.is_free(nxt, t1)
+                    or table.is_swap(idx, nxt, t1)):
+                continue
+            if nxt_state not in came_from:
+                came_from[nxt_state] = state
+                frontier.put(nxt_state, (t1 + estimate) * TIE_BREAK + estimate)
+    return None
@@ -0,0 +1,82 @@
+from collections import OrderedDict, deque
+from typing import List, Tuple
+from Grid import Grid, DIRECTION_OFFSETS
+
+UNREACHABLE = -1
+
+
+def distance_field(grid, goal):  # type: (Grid, Tuple[int, int]) -> List[int]
+    """
+    Breadth first search from the goal over the passable terrain.
+    Every cell holds its walking distance to the goal or UNREACHABLE.
+    Occupancy is ignored so the field stays valid for as long as the terrain does.
+    """
+    field = [UNREACHABLE] * (grid.width * grid.height)
+    neighbours = grid.neighbours
+    goal_x, goal_y = goal
+    goal_idx = grid.index(goal_x, goal_y)
+    field[goal_idx] = 0
+    queue = deque([goal_idx])
+    if not grid.passable[goal_idx]:
+        # Impassable goals (e.g. a wall next to karbonite) are approached from their passable neighbours
+        queue.popleft()
+        for dx, dy in DIRECTION_OFFSETS:
+            if grid.is_passable(goal_x + dx, goal_y + dy):
+                idx = grid.index(goal_x + dx, goal_y + dy)
+                field[idx] = 1
+                queue.append(idx)
+
+    while queue:
+        current = queue.popleft()
+        next_distance = field[current] + 1
+        for nxt in neighbours[current]:
+            if field[nxt] == UNREACHABLE:
+                field[nxt] = next_distance
+                queue.append(nxt)
+    return field
+
+
+def downhill_step(grid, field, position):  # type: (Grid, List[int], Tuple[int, int]) -> Tuple[int, int]
+    """
+    Returns the free neighbouring cell closest to the goal of the field,
+    or None when there is no free cell strictly closer than the current one.
+    """
+    idx = grid.index(position[0], position[1])
+    best_distance = field[idx]
+    if best_distance == UNREACHABLE:
+        return None
+    best = None
+    occupied = grid.occupied
+    for nxt in grid.neighbours[idx]:
+        distance = field[nxt]
+        if distance != UNREACHABLE and distance < best_distance and not occupied[nxt]:
+            best_distance = distance
+            best = nxt
+    if best is None:
+        return None
+    return grid.coords(best)
+
+
+class FlowFieldCache:
+    """
+    Distance fields keyed by grid and goal, shared by every unit heading to the same destination.
+    The least recently used fields are dropped once the capacity is reached.
+    """
+
+    def __init__(self, capacity: int = 64) -> None:
+        self.capacity = capacity  # type: int
+        self.fields = OrderedDict()  # type: OrderedDict
+
+    def field(self, grid, goal):  # type: (Grid, Tuple[int, int]) -> List[int]
+        key = (id(grid), goal)
+        if key in self.fields:
+            self.fields.move_to_end(key)
+            return self.fields[key]
+        field = distance_field(grid, goal)
+        self.fields[key] = field
+        if len(self.fields) > self.capacity:
+            self.fields.popitem(last=False)
+        return field
+
+
+flow_fields = FlowFieldCache()
@@ -0,0 +1,78 @@
+from typing import Dict, List, Tuple
+
+# Offsets in the same order as bc.Direction, so DIRECTION_OFFSETS[i] is the (dx, dy) of bc.Direction(i)
+DIRECTION_OFFSETS = [(0, 1), (1, 1), (1, 0), (1, -1), (0, -1), (-1, -1), (-1, 0), (-1, 1)]
+OFFSET_TO_DIRECTION = {offset: i for i, offset in enumerate(DIRECTION_OFFSETS)}
+
+
+class Grid:
+    """
+    Snapshot of a planet's terrain as a flat passability bytearray plus a per-turn occupancy bitmap.
+    Cells are addressed by (x, y) or by the flat index y * width + x, all searches work on the indices.
+    """
+
+    def __init__(self, width: int, height: int, passable: bytearray) -> None:
+        self.width = width  # type: int
+        self.height = height  # type: int
+        self.passable = passable  # type: bytearray
+        self.occupied = bytearray(width * height)  # type: bytearray
+        # Cell index -> id of the unit standing there and unit id -> cell index, for the units placed by id
+        self.unit_ids = dict()  # type: Dict[int, int]
+        self.positions = dict()  # type: Dict[int, int]
+        self.neighbours = self.build_neighbours()  # type: List[List[int]]
+        # Filled in by MapCache.precompute_landmarks over the first turns
+        self.landmarks = None  # type: LandmarkTable
+
+    def build_neighbours(self):
+        neighbours = []
+        for idx in range(self.width * self.height):
+            x, y = self.coords(idx)
+            cell_neighbours = []
+            if self.passable[idx]:
+                for dx, dy in DIRECTION_OFFSETS:
+                    nx, ny = x + dx, y + dy
+                    if self.in_bounds(nx, ny) and self.passable[ny * self.width + nx]:
+                        cell_neighbours.append(ny * self.width + nx)
+            neighbours.append(cell_neighbours)
+        return neighbours
+
+    def index(self, x: int, y: int) -> int:
+        return y * self.width + x
+
+    def coords(self, idx: int):  # type: (int) -> Tuple[int, int]
+        return idx % self.width, idx // self.width
+
+    def in_bounds(self, x: int, y: int) -> bool:
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def is_passable(self, x: int, y: int) -> bool:
+        return self.in_bounds(x, y) and self.passable[y * self.width + x] == 1
+
+    def is_free(self, x: int, y: int) -> bool:
+        return self.is_passable(x, y) and self.occupied[y * self.width + x] == 0
+
+    def clear_occupancy(self) -> None:
+        self.occupied = bytearray(self.width * self.height)
+        self.unit_ids = dict()
+        self.positions = dict()
+
+    def place_unit(self, unit_id: int, x: int, y: int) -> None:
+        if self.in_bounds(x, y):
+            idx = y * self.width + x
+            self.occupied[idx] = 1
+            self.unit_ids[idx] = unit_id
+            self.positions[unit_id] = idx
+
+    def remove_unit(self, unit_id: int) -> None:
+        idx = self.positions.pop(unit_id, None)
+        if idx is not None:
+            self.occupied[idx] = 0
+            self.unit_ids.pop(idx, None)
+
+    def unit_at(self, x: int, y: int) -> int:
+        """
+        Returns the id of the unit on the cell or None if the cell is free.
+        """
+        if not self.in_bounds(x, y):
+            return None
+        return self.unit_ids.get(y * self.width + x)
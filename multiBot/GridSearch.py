@@ -0,0 +1,275 @@
+import time
+from typing import Callable, Dict, List, Tuple
+from PriorityQueue import PriorityQueue
+from Grid import Grid, DIRECTION_OFFSETS
+
+# Priorities are f * TIE_BREAK + h, so among equal f the cell closer to the goal is popped first.
+# Any distance on a map of at most 50x50 cells is below TIE_BREAK.
+TIE_BREAK = 1 << 12
+# Expansions between two looks at the clock of a search with a time budget
+CLOCK_INTERVAL = 32
+
+
+class SearchBudget:
+    """
+    Limits a search to a number of expanded cells, a number of milliseconds or both.
+    """
+
+    def __init__(self, max_expansions: int = None, time_ms: float = None) -> None:
+        self.max_expansions = max_expansions  # type: int
+        self.deadline = time.time() + time_ms / 1000 if time_ms is not None else None  # type: float
+
+    def is_exhausted(self, expanded: int) -> bool:
+        if self.max_expansions is not None and expanded >= self.max_expansions:
+            return True
+        return self.deadline is not None and expanded % CLOCK_INTERVAL == 0 and time.time() >= self.deadline
+
+
+def grid_a_star(grid, start, goal, stats=None, budget=None):
+    # type: (Grid, Tuple[int, int], Tuple[int, int], Dict, SearchBudget) -> List[Tuple[int, int]]
+    """
+    A* over the grid indices, no FFI calls in the loop.
+    Every move costs 1 and the heuristic is consistent, so each cell is expanded at most once.
+    Ties on f are broken toward the goal by preferring the lower h, see TIE_BREAK.
+    Returns the path as a list of (x, y) tuples including start and goal, or None if the goal is not reachable.
+    When the budget runs out first, the path to the reached cell closest to the goal is returned instead.
+    The number of expanded cells is stored in stats['expanded'] when a stats dict is given, stats['partial']
+    tells whether the budget ran out and stats['component'] holds the cells searched in vain for an unreachable goal.
+    """
+    neighbours = grid.neighbours
+    occupied = grid.occupied
+    start_idx = grid.index(start[0], start[1])
+    goal_x, goal_y = goal
+    if not grid.is_free(goal_x, goal_y):
+        return None
+    goal_idx = grid.index(goal_x, goal_y)
+    if grid.landmarks is not None and not grid.landmarks.is_reachable(start_idx, goal_idx):
+        return None
+    h = heuristic_to(grid, goal_idx)
+
+    frontier = PriorityQueue()
+    put = frontier.put
+    put(start_idx, 0)
+    came_from = {start_idx: None}
+    cost_so_far = {start_idx: 0}
+    closed = set()
+    # Reached cell with the lowest estimate, the end of the partial path when the budget runs out
+    best = start_idx
+    best_estimate = h(start_idx)
+
+    is_path_found = False
+    is_partial = False
+
+    while not frontier.empty():
+        if budget is not None and budget.is_exhausted(len(closed)):
+            is_partial = True
+            break
+        current = frontier.get()
+        if current in closed:
+            # Stale entry of a cell that was put again with a lower cost
+            continue
+        if current == goal_idx:
+            is_path_found = True
+            break
+        closed.add(current)
+
+        new_cost = cost_so_far[current] + 1
+        for nxt in neighbours[current]:
+            if occupied[nxt] or nxt in closed:
+                continue
+            if nxt not in cost_so_far or new_cost < cost_so_far[nxt]:
+                cost_so_far[nxt] = new_cost
+                estimate = h(nxt)
+                put(nxt, (new_cost + estimate) * TIE_BREAK + estimate)
+                came_from[nxt] = current
+                if estimate < best_estimate:
+                    best = nxt
+                    best_estimate = estimate
+
+    return search_result(grid, came_from, goal_idx if is_path_found else best, is_path_found, is_partial, closed,
+                         stats)
+
+
+def grid_jps(grid, start, goal, stats=None, budget=None):
+    # type: (Grid, Tuple[int, int], Tuple[int, int], Dict, SearchBudget) -> List[Tuple[int, int]]
+    """
+    Jump Point Search over the grid, returns the same path format and stats as grid_a_star.
+    Only jump points enter the open list, straight and diagonal runs between them are skipped.
+    Units may move diagonally between two blocked cells, so corner cutting is allowed.
+    The paths are optimal with the game's unit diagonal costs, as long as the ones grid_a_star finds.
+    """
+    width = grid.width
+    height = grid.height
+    passable = grid.passable
+    occupied = grid.occupied
+    start_x, start_y = start
+    goal_x, goal_y = goal
+    if not grid.is_free(goal_x, goal_y):
+        return None
+    start_idx = grid.index(start_x, start_y)
+    goal_idx = grid.index(goal_x, goal_y)
+    if grid.landmarks is not None and not grid.landmarks.is_reachable(start_idx, goal_idx):
+        return None
+    h = heuristic_to(grid, goal_idx)
+
+    def walkable(x, y):
+        if 0 <= x < width and 0 <= y < height:
+            idx = y * width + x
+            return passable[idx] and not occupied[idx]
+        return False
+
+    def jump(x, y, dx, dy):
+        while True:
+            x += dx
+            y += dy
+            if not walkable(x, y):
+                return None
+            if x == goal_x and y == goal_y:
+                return x, y
+            if dx != 0 and dy != 0:
+                if ((not walkable(x - dx, y) and walkable(x - dx, y + dy))
+                        or (not walkable(x, y - dy) and walkable(x + dx, y - dy))):
+                    return x, y
+                if jump(x, y, dx, 0) is not None or jump(x, y, 0, dy) is not None:
+                    return x, y
+            elif dx != 0:
+                if ((not walkable(x, y + 1) and walkable(x + dx, y + 1))
+                        or (not walkable(x, y - 1) and walkable(x + dx, y - 1))):
+                    return x, y
+            else:
+                if ((not walkable(x + 1, y) and walkable(x + 1, y + dy))
+                        or (not walkable(x - 1, y) and walkable(x - 1, y + dy))):
+                    return x, y
+
+    def pruned_directions(x, y, parent):
+        if parent is None:
+            return DIRECTION_OFFSETS
+        parent_x, parent_y = grid.coords(parent)
+        dx = (x > parent_x) - (x < parent_x)
+        dy = (y > parent_y) - (y < parent_y)
+        if dx != 0 and dy != 0:
+            result = [(dx, 0), (0, dy), (dx, dy)]
+            if not walkable(x - dx, y):
+                result.append((-dx, dy))
+            if not walkable(x, y - dy):
+                result.append((dx, -dy))
+        elif dx != 0:
+            result = [(dx, 0)]
+            if not walkable(x, y + 1):
+                result.append((dx, 1))
+            if not walkable(x, y - 1):
+                result.append((dx, -1))
+        else:
+            result = [(0, dy)]
+            if not walkable(x + 1, y):
+                result.append((1, dy))
+            if not walkable(x - 1, y):
+                result.append((-1, dy))
+        return result
+
+    frontier = PriorityQueue()
+    frontier.put(start_idx, 0)
+    came_from = {start_idx: None}
+    cost_so_far = {start_idx: 0}
+    closed = set()
+    best = start_idx
+    best_estimate = h(start_idx)
+
+    is_path_found = False
+    is_partial = False
+
+    while not frontier.empty():
+        if budget is not None and budget.is_exhausted(len(closed)):
+            is_partial = True
+            break
+        current = frontier.get()
+        if current in closed:
+            continue
+        if current == goal_idx:
+            is_path_found = True
+            break
+        closed.add(current)
+
+        x, y = grid.coords(current)
+        for dx, dy in pruned_directions(x, y, came_from[current]):
+            jump_point = jump(x, y, dx, dy)
+            if jump_point is None:
+                continue
+            jump_x, jump_y = jump_point
+            nxt = jump_y * width + jump_x
+            if nxt in closed:
+                continue
+            new_cost = cost_so_far[current] + max(abs(jump_x - x), abs(jump_y - y))
+            if nxt not in cost_so_far or new_cost < cost_so_far[nxt]:
+                cost_so_far[nxt] = new_cost
+                estimate = h(nxt)
+                frontier.put(nxt, (new_cost + estimate) * TIE_BREAK + estimate)
+                came_from[nxt] = current
+                if estimate < best_estimate:
+                    best = nxt
+                    best_estimate = estimate
+
+    path = search_result(grid, came_from, goal_idx if is_path_found else best, is_path_found, is_partial, closed,
+                         stats)
+    return interpolate_path(path) if path is not None else None
+
+
+def search_result(grid, came_from, end_idx, is_path_found, is_partial, closed, stats):
+    # type: (Grid, Dict[int, int], int, bool, bool, set, Dict) -> List[Tuple[int, int]]
+    if stats is not None:
+        stats['expanded'] = len(closed)
+        stats['partial'] = is_partial
+        if not is_path_found and not is_partial:
+            stats['component'] = closed
+    if not is_path_found and not is_partial:
+        return None
+    return reconstruct_path(grid, came_from, end_idx)
+
+
+def interpolate_path(jump_points):  # type: (List[Tuple[int, int]]) -> List[Tuple[int, int]]
+    """
+    Fills in the cells of the straight and diagonal runs between consecutive jump points.
+    """
+    path = jump_points[:1]
+    for x, y in jump_points[1:]:
+        last_x, last_y = path[-1]
+        dx = (x > last_x) - (x < last_x)
+        dy = (y > last_y) - (y < last_y)
+        while (last_x, last_y) != (x, y):
+            last_x += dx
+            last_y += dy
+            path.append((last_x, last_y))
+    return path
+
+
+def heuristic_to(grid, goal_idx):  # type: (Grid, int) -> Callable[[int], int]
+    """
+    Chebyshev distance to the goal, combined with the landmark bound once the grid has landmark tables.
+    Diagonal moves cost the same as straight ones, so Chebyshev is the exact distance on an empty map,
+    octile distance would overestimate it.
+    """
+    width = grid.width
+    goal_x, goal_y = grid.coords(goal_idx)
+
+    def chebyshev(idx):
+        dx = idx % width - goal_x
+        dy = idx // width - goal_y
+        if dx < 0:
+            dx = -dx
+        if dy < 0:
+            dy = -dy
+        return dx if dx > dy else dy
+
+    if grid.landmarks is None or not grid.landmarks.fields:
+        return chebyshev
+    return grid.landmarks.heuristic_to(goal_idx, chebyshev)
+
+
+def reconstruct_path(grid, came_from, goal_idx):  # type: (Grid, Dict[int, int], int) -> List[Tuple[int, int]]
+    path = []
+    node = goal_idx
+    while node is not None:
+        path.append(grid.coords(node))
+        node = came_from[node]
+    path.reverse()
+    return path
@@ -0,0 +1,202 @@
+from collections import defaultdict, deque
+from typing import Dict, List, Set, Tuple
+from Grid import Grid
+from GridSearch import TIE_BREAK
+from PriorityQueue import PriorityQueue
+
+CLUSTER_SIZE = 10
+# Virtual nodes of the abstract graph
+START = -1
+GOAL = -2
+
+
+class HierarchicalGrid:
+    """
+    HPA* abstraction of a static grid. The grid is cut into square clusters, every passable run along
+    a cluster border gets one entrance on each side, and the walking distances between the entrances
+    of a cluster are precomputed. A query searches the small entrance graph and only refines the way
+    to the first entrance, so its cost barely depends on how far the goal is.
+    """
+
+    def __init__(self, grid: Grid, cluster_size: int = CLUSTER_SIZE) -> None:
+        self.grid = grid  # type: Grid
+        self.cluster_size = cluster_size  # type: int
+        self.entrances = defaultdict(set)  # type: Dict[Tuple[int, int], Set[int]]
+        self.edges = defaultdict(dict)  # type: Dict[int, Dict[int, int]]
+        self.build_entrances()
+        self.build_intra_edges()
+
+    def cluster_of(self, idx: int):  # type: (int) -> Tuple[int, int]
+        x, y = self.grid.coords(idx)
+        return x // self.cluster_size, y // self.cluster_size
+
+    def bounds(self, cluster):  # type: (Tuple[int, int]) -> Tuple[int, int, int, int]
+        x0 = cluster[0] * self.cluster_size
+        y0 = cluster[1] * self.cluster_size
+        return x0, y0, min(x0 + self.cluster_size, self.grid.width), min(y0 + self.cluster_size, self.grid.height)
+
+    def add_transition(self, a, b):  # type: (Tuple[int, int], Tuple[int, int]) -> None
+        grid = self.grid
+        if not grid.is_passable(a[0], a[1]) or not grid.is_passable(b[0], b[1]):
+            return
+        a_idx = grid.index(a[0], a[1])
+        b_idx = grid.index(b[0], b[1])
+        self.entrances[self.cluster_of(a_idx)].add(a_idx)
+        self.entrances[self.cluster_of(b_idx)].add(b_idx)
+        self.edges[a_idx][b_idx] = 1
+        self.edges[b_idx][a_idx] = 1
+
+    def add_border(self, side_a, side_b):  # type: (List[Tuple[int, int]], List[Tuple[int, int]]) -> None
+        """
+        Adds one transition for every group of crossings between the facing cells of two clusters.
+        Straight and diagonal crossings belong to the same group when their cells touch on both sides,
+        so every group connects one area on each side and no area is left without an entrance.
+        """
+        grid = self.grid
+        crossings = [(i, j) for i in range(len(side_a)) for j in range(i - 1, i + 2)
+                     if 0 <= j < len(side_b)
+                     and grid.is_passable(side_a[i][0], side_a[i][1]) and grid.is_passable(side_b[j][0], side_b[j][1])]
+        group = []
+        for i, j in crossings:
+            if group and (i - group[-1][0] > 1 or abs(j - group[-1][1]) > 1):
+                self.add_transition(*self.middle_crossing(group, side_a, side_b))
+                group = []
+            group.append((i, j))
+        if group:
+            self.add_transition(*self.middle_crossing(group, side_a, side_b))
+
+    @staticmethod
+    def middle_crossing(group, side_a, side_b):
+        # Prefer a straight crossing near the middle of the group
+        group = sorted(group, key=lambda c: (abs(c[0] - c[1]), abs(c[0] - group[len(group) // 2][0])))
+        return side_a[group[0][0]], side_b[group[0][1]]
+
+    def build_entrances(self) -> None:
+        size = self.cluster_size
+        width = self.grid.width
+        height = self.grid.height
+        for x in range(size, width, size):
+            for y0 in range(0, height, size):
+                rows = range(y0, min(y0 + size, height))
+                self.add_border([(x - 1, y) for y in rows], [(x, y) for y in rows])
+        for y in range(size, height, size):
+            for x0 in range(0, width, size):
+                columns = range(x0, min(x0 + size, width))
+                self.add_border([(x, y - 1) for x in columns], [(x, y) for x in columns])
+        # Diagonal moves across cluster corners
+        for x in range(size, width, size):
+            for y in range(size, height, size):
+                self.add_transition((x - 1, y - 1), (x, y))
+                self.add_transition((x - 1, y), (x, y - 1))
+
+    def build_intra_edges(self) -> None:
+        for cluster, nodes in self.entrances.items():
+            for node in nodes:
+                distances, _ = self.local_search(node, cluster, False)
+                for other in nodes:
+                    if other != node and other in distances:
+                        self.edges[node][other] = distances[other]
+
+    def local_search(self, source, cluster, avoid_units):
+        # type: (int, Tuple[int, int], bool) -> Tuple[Dict[int, int], Dict[int, int]]
+        """
+        Breadth first search from the source that does not leave the cluster.
+        """
+        x0, y0, x1, y1 = self.bounds(cluster)
+        width = self.grid.width
+        neighbours = self.grid.neighbours
+        occupied = self.grid.occupied
+        distances = {source: 0}
+        parents = {source: None}
+        queue = deque([source])
+        while queue:
+            current = queue.popleft()
+            for nxt in neighbours[current]:
+                if nxt in distances or (avoid_units and occupied[nxt]):
+                    continue
+                x, y = nxt % width, nxt // width
+                if x0 <= x < x1 and y0 <= y < y1:
+                    distances[nxt] = distances[current] + 1
+                    parents[nxt] = current
+                    queue.append(nxt)
+        return distances, parents
+
+    def abstract_path(self, start_idx, goal_idx):  # type: (int, int) -> List[int]
+        """
+        A* over the entrance graph with the start and goal linked to the entrances of their clusters.
+        Returns the entrance cells on the way including the goal, without the start, or None.
+        """
+        start_cluster = self.cluster_of(start_idx)
+        goal_cluster = self.cluster_of(goal_idx)
+        start_distances, _ = self.local_search(start_idx, start_cluster, False)
+        goal_distances, _ = self.local_search(goal_idx, goal_cluster, False)
+        goal_links = {e: goal_distances[e] for e in self.entrances[goal_cluster] if e in goal_distances}
+        goal_x, goal_y = self.grid.coords(goal_idx)
+
+        def successors(node):
+            if node == START:
+                result = {e: start_distances[e] for e in self.entrances[start_cluster] if e in start_distances}
+                if goal_idx in start_distances:
+                    result[GOAL] = start_distances[goal_idx]
+                return result.items()
+            result = list(self.edges[node].items())
+            if node in goal_links:
+                result.append((GOAL, goal_links[node]))
+            return result
+
+        def h(node):
+            if node == GOAL:
+                return 0
+            x, y = self.grid.coords(node)
+            return max(abs(x - goal_x), abs(y - goal_y))
+
+        frontier = PriorityQueue()
+        frontier.put(START, 0)
+        came_from = {START: None}
+        cost_so_far = {START: 0}
+        closed = set()
+        while not frontier.empty():
+            current = frontier.get()
+            if current in closed:
+                continue
+            if current == GOAL:
+                path = []
+                while current != START:
+                    path.append(goal_idx if current == GOAL else current)
+                    current = came_from[current]
+                path.reverse()
+                return path
+            closed.add(current)
+            for nxt, cost in successors(current):
+                new_cost = cost_so_far[current] + cost
+                if nxt not in closed and (nxt not in cost_so_far or new_cost < cost_so_far[nxt]):
+                    cost_so_far[nxt] = new_cost
+                    estimate = h(nxt)
+                    frontier.put(nxt, (new_cost + estimate) * TIE_BREAK + estimate)
+                    came_from[nxt] = current
+        return None
+
+    def first_step(self, start, goal):  # type: (Tuple[int, int], Tuple[int, int]) -> Tuple[int, int]
+        """
+        Returns the next free cell on the way from start to goal, or None if there is none.
+        Only the way to the first entrance is refined on the full grid.
+        """
+        grid = self.grid
+        start_idx = grid.index(start[0], start[1])
+        path = self.abstract_path(start_idx, grid.index(goal[0], goal[1]))
+        if path is None:
+            return None
+        waypoint = next((node for node in path if node != start_idx), None)
+        if waypoint is None:
+            return None
+        waypoint_x, waypoint_y = grid.coords(waypoint)
+        if max(abs(waypoint_x - start[0]), abs(waypoint_y - start[1])) == 1:
+            return (waypoint_x, waypoint_y) if grid.is_free(waypoint_x, waypoint_y) else None
+
+        _, parents = self.local_search(start_idx, self.cluster_of(start_idx), True)
+        if waypoint not in parents:
+            return None
+        node = waypoint
+        while parents[node] != start_idx:
+            node = parents[node]
+        return grid.coords(node)
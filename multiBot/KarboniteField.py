@@ -0,0 +1,171 @@
+import battlecode as bc
+import heapq
+from typing import Dict, Iterable, List, Set, Tuple
+from FlowField import UNREACHABLE
+from Grid import Grid
+from UnitSnapshot import UnitRecord
+
+
+class NearestDeposit:
+    """
+    Multi-source breadth first search from all the deposits over the passable terrain. Every cell holds the walking
+    distance to its closest deposit and which deposit that is, so the nearest deposit is a lookup.
+    A new deposit only relaxes the cells it is closer to, a depleted one only resets the cells it was closest to
+    and fills them again from their neighbours.
+    """
+
+    def __init__(self, grid: Grid, deposits: Iterable[int]) -> None:
+        self.grid = grid  # type: Grid
+        self.distance = [UNREACHABLE] * (grid.width * grid.height)  # type: List[int]
+        self.source = [UNREACHABLE] * (grid.width * grid.height)  # type: List[int]
+        self.relax([(0, idx, idx) for idx in deposits if grid.passable[idx]])
+
+    def nearest(self, x: int, y: int):  # type: (int, int) -> Tuple[int, int]
+        """
+        Returns the index of the closest deposit and the walking distance to it, or None if none is reachable.
+        """
+        idx = self.grid.index(x, y)
+        if self.distance[idx] == UNREACHABLE:
+            return None
+        return self.source[idx], self.distance[idx]
+
+    def add(self, deposit: int) -> None:
+        # Deposits on impassable terrain cannot be walked to, the maps have none
+        if self.grid.passable[deposit]:
+            self.relax([(0, deposit, deposit)])
+
+    def remove(self, deposit: int) -> None:
+        distance = self.distance
+        source = self.source
+        affected = [idx for idx, closest in enumerate(source) if closest == deposit]
+        for idx in affected:
+            distance[idx] = UNREACHABLE
+            source[idx] = UNREACHABLE
+        seeds = []
+        for idx in affected:
+            for nxt in self.grid.neighbours[idx]:
+                if distance[nxt] != UNREACHABLE:
+                    seeds.append((distance[nxt] + 1, idx, source[nxt]))
+        self.relax(seeds)
+
+    def relax(self, seeds):  # type: (List[Tuple[int, int, int]]) -> None
+        """
+        Dijkstra from the (distance, cell, deposit) seeds, a cell is only updated when it gets closer.
+        """
+        distance = self.distance
+        source = self.source
+        neighbours = self.grid.neighbours
+        heap = []
+        for seed_distance, idx, deposit in seeds:
+            if distance[idx] == UNREACHABLE or seed_distance < distance[idx]:
+                distance[idx] = seed_distance
+                source[idx] = deposit
+                heap.append((seed_distance, idx))
+        heapq.heapify(heap)
+        while heap:
+            current_distance, current = heapq.heappop(heap)
+            if current_distance != distance[current]:
+                continue
+            next_distance = current_distance + 1
+            deposit = source[current]
+            for nxt in neighbours[current]:
+                if distance[nxt] == UNREACHABLE or next_distance < distance[nxt]:
+                    distance[nxt] = next_distance
+                    source[nxt] = deposit
+                    heapq.heappush(heap, (next_distance, nxt))
+
+
+class KarboniteField:
+    """
+    Karbonite we believe lies on every cell of our planet, a flat list indexed y * width + x like Grid.
+    Karbonite only disappears by harvesting and only appears with Mars asteroid strikes, which are known in advance.
+    So every turn only the deposits our units can see and the cells we harvested are read from the engine,
+    and the strikes are added as they land. The nearest index is kept up to date as deposits appear and run out.
+    """
+
+    def __init__(self, planet: bc.Planet, width: int, height: int, amounts: List[int]) -> None:
+        self.planet = planet  # type: bc.Planet
+        self.width = width  # type: int
+        self.height = height  # type: int
+        self.amounts = amounts  # type: List[int]
+        self.deposits = {idx for idx, amount in enumerate(amounts) if amount > 0}  # type: Set[int]
+        self.harvested = set()  # type: Set[int]
+        self.asteroid_pattern = None  # type: bc.AsteroidPattern
+        self.applied_round = 0  # type: int
+        # Vision range -> offsets of the cells a unit with that range sees
+        self.vision_offsets = dict()  # type: Dict[int, List[Tuple[int, int]]]
+        self.nearest = None  # type: NearestDeposit
+
+    def index_nearest(self, grid: Grid) -> None:
+        self.nearest = NearestDeposit(grid, self.deposits)
+
+    @staticmethod
+    def from_planet_map(planet_map: bc.PlanetMap) -> 'KarboniteField':
+        amounts = list(planet_map.initial_karbonite_grid())
+        return KarboniteField(planet_map.planet, planet_map.width, planet_map.height, amounts)
+
+    def at(self, x: int, y: int) -> int:
+        return self.amounts[y * self.width + x]
+
+    def set(self, idx: int, amount: int) -> None:
+        self.amounts[idx] = amount
+        if amount > 0 and idx not in self.deposits:
+            self.deposits.add(idx)
+            if self.nearest is not None:
+                self.nearest.add(idx)
+        elif amount <= 0 and idx in self.deposits:
+            self.deposits.discard(idx)
+            if self.nearest is not None:
+                self.nearest.remove(idx)
+
+    def record_harvest(self, x: int, y: int, amount: int) -> None:
+        """
+        Lowers the cell right away and reads it again on the next update.
+        """
+        idx = y * self.width + x
+        self.set(idx, max(0, self.amounts[idx] - amount))
+        self.harvested.add(idx)
+
+    def update(self, gc: bc.GameController, units: Iterable[UnitRecord]) -> None:
+        if self.planet == bc.Planet.Mars:
+            self.apply_asteroids(gc)
+        to_read = self.visible_deposits(units) | self.harvested
+        self.harvested = set()
+        for idx in to_read:
+            location = bc.MapLocation(self.planet, idx % self.width, idx // self.width)
+            if gc.can_sense_location(location):
+                self.set(idx, gc.karbonite_at(location))
+
+    def apply_asteroids(self, gc: bc.GameController) -> None:
+        if self.asteroid_pattern is None:
+            self.asteroid_pattern = gc.asteroid_pattern()
+        current_round = gc.round()
+        for round_number in range(self.applied_round + 1, current_round + 1):
+            if self.asteroid_pattern.has_asteroid(round_number):
+                strike = self.asteroid_pattern.asteroid(round_number)
+                location = strike.location
+                idx = location.y * self.width + location.x
+                self.set(idx, self.amounts[idx] + strike.karbonite)
+        self.applied_round = current_round
+
+    def visible_deposits(self, units: Iterable[UnitRecord]) -> Set[int]:
+        visible = set()
+        for unit in units:
+            if not unit.is_on_map:
+                continue
+            for dx, dy in self.offsets_within(unit.vision_range):
+                x, y = unit.x + dx, unit.y + dy
+                if 0 <= x < self.width and 0 <= y < self.height:
+                    idx = y * self.width + x
+                    if idx in self.deposits:
+                        visible.add(idx)
+        return visible
+
+    def offsets_within(self, radius_squared: int) -> List[Tuple[int, int]]:
+        if radius_squared not in self.vision_offsets:
+            radius = int(radius_squared ** 0.5)
+            self.vision_offsets[radius_squared] = [(dx, dy)
+                                                   for dx in range(-radius, radius + 1)
+                                                   for dy in range(-radius, radius + 1)
+                                                   if dx * dx + dy * dy <= radius_squared]
+        return self.vision_offsets[radius_squared]
@@ -0,0 +1,82 @@
+from typing import Callable, List
+from Grid import Grid
+from FlowField import distance_field, UNREACHABLE
+
+LANDMARK_COUNT = 8
+
+
+class LandmarkTable:
+    """
+    ALT (A*, landmarks, triangle inequality) distance tables of a static grid.
+    The walking distance from every cell to each landmark gives the lower bound |d(L, a) - d(L, b)| on d(a, b),
+    which is admissible and consistent. Landmarks are added one at a time so the work can be spread over turns.
+    """
+
+    def __init__(self, grid: Grid, count: int = LANDMARK_COUNT) -> None:
+        self.grid = grid  # type: Grid
+        self.count = count  # type: int
+        self.landmarks = []  # type: List[int]
+        self.fields = []  # type: List[List[int]]
+        # Distance of every cell to its closest landmark, used to pick the next landmark
+        self.closest = None  # type: List[int]
+
+    def is_complete(self) -> bool:
+        return len(self.fields) >= self.count or (self.closest is not None and self.next_landmark() is None)
+
+    def next_landmark(self) -> int:
+        if self.closest is None:
+            # Start from the corner of the first passable cell's component that is farthest away from it
+            first = self.grid.passable.find(1)
+            if first == -1:
+                return None
+            field = distance_field(self.grid, self.grid.coords(first))
+            return max(range(len(field)), key=field.__getitem__)
+        best = max(range(len(self.closest)), key=self.closest.__getitem__)
+        if self.closest[best] <= 0:
+            return None
+        return best
+
+    def add_landmark(self) -> bool:
+        """
+        Computes the table of one more landmark, returns False when no more landmarks are needed.
+        """
+        if len(self.fields) >= self.count:
+            return False
+        landmark = self.next_landmark()
+        if landmark is None:
+            return False
+        field = distance_field(self.grid, self.grid.coords(landmark))
+        self.landmarks.append(landmark)
+        self.fields.append(field)
+        if self.closest is None:
+            self.closest = list(field)
+        else:
+            self.closest = [d if d < c else c for d, c in zip(field, self.closest)]
+        return True
+
+    def is_reachable(self, start_idx: int, goal_idx: int) -> bool:
+        """
+        Cells are in different components when a landmark reaches exactly one of them.
+        """
+        for field in self.fields:
+            if (field[start_idx] == UNREACHABLE) != (field[goal_idx] == UNREACHABLE):
+                return False
+        return True
+
+    def heuristic_to(self, goal_idx: int, base: Callable[[int], int] = None) -> Callable[[int], int]:
+        """
+        Returns the landmark lower bound on the distance to the goal, tightened by the base heuristic if given.
+        """
+        pairs = [(field, field[goal_idx]) for field in self.fields]
+
+        def h(idx):
+            best = base(idx) if base is not None else 0
+            for field, goal_distance in pairs:
+                difference = field[idx] - goal_distance
+                if difference < 0:
+                    difference = -difference
+                if difference > best:
+                    best = difference
+            return best
+
+        return h
@@ -1,4 +1,6 @@
 import battlecode as bc
+from Grid import DIRECTION_OFFSETS
+from MapCache import get_grid
 
 cross_directions = [
     bc.Direction.Northeast,
@@ -9,14 +11,15 @@ cross_directions = [
 
 
 def is_empty(gc, planet_map, map_loc):
-    return (planet_map.on_map(map_loc)
-            and planet_map.is_passable_terrain_at(map_loc)
-            and len(gc.sense_nearby_units(map_loc, 0)) == 0)
+    # Terrain and units both come from the grid, its occupancy index is refreshed once per round
+    return get_grid(gc, planet_map.planet).is_free(map_loc.x, map_loc.y)
 
 
 def find_empty_loc_near(gc, planet_map, loc):
-    for d in bc.Direction:
-        near_loc = loc.add(d)
-        if is_empty(gc, planet_map, near_loc):
-            return near_loc
+    grid = get_grid(gc, planet_map.planet)
+    x, y = loc.x, loc.y
+    # Same order as bc.Direction, Center last
+    for dx, dy in DIRECTION_OFFSETS + [(0, 0)]:
+        if grid.is_free(x + dx, y + dy):
+            return bc.MapLocation(planet_map.planet, x + dx, y + dy)
     return None
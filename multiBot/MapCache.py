@@ -0,0 +1,80 @@
+import battlecode as bc
+import time
+from typing import Dict
+from Grid import Grid
+from HierarchicalGrid import HierarchicalGrid
+from Landmarks import LandmarkTable
+from UnitSnapshot import unit_snapshot
+
+# Starting maps never change, so both the native maps and their grids are built once per planet.
+# The caches are keyed by int(planet), bc.Planet overrides __eq__ without __hash__ and cannot be a key.
+_starting_maps = dict()  # type: Dict[int, bc.PlanetMap]
+_grids = dict()  # type: Dict[int, Grid]
+_occupancy_rounds = dict()  # type: Dict[int, int]
+_hierarchies = dict()  # type: Dict[int, HierarchicalGrid]
+
+
+def starting_map(gc: bc.GameController, planet: bc.Planet) -> bc.PlanetMap:
+    key = int(planet)
+    if key not in _starting_maps:
+        _starting_maps[key] = gc.starting_map(planet)
+    return _starting_maps[key]
+
+
+def grid_from_planet_map(planet_map: bc.PlanetMap) -> Grid:
+    return Grid(planet_map.width, planet_map.height, planet_map.passable_grid())
+
+
+def get_grid(gc: bc.GameController, planet: bc.Planet) -> Grid:
+    """
+    Returns the grid of the planet, the occupancy of the current planet is refreshed once per round.
+    """
+    key = int(planet)
+    if key not in _grids:
+        _grids[key] = grid_from_planet_map(starting_map(gc, planet))
+    grid = _grids[key]
+    if planet == gc.planet():
+        current_round = gc.round()
+        if _occupancy_rounds.get(key) != current_round:
+            refresh_occupancy(gc, grid)
+            _occupancy_rounds[key] = current_round
+    return grid
+
+
+def get_hierarchy(gc: bc.GameController, planet: bc.Planet) -> HierarchicalGrid:
+    """
+    Returns the cluster abstraction of the planet's grid, built on first use, with the grid occupancy refreshed.
+    """
+    grid = get_grid(gc, planet)
+    key = int(planet)
+    if key not in _hierarchies:
+        _hierarchies[key] = HierarchicalGrid(grid)
+    return _hierarchies[key]
+
+
+def refresh_occupancy(gc: bc.GameController, grid: Grid) -> None:
+    """
+    Rebuilds the occupancy index from the units of this round's snapshot, Occupancy keeps it right during the turn.
+    """
+    grid.clear_occupancy()
+    for unit in unit_snapshot(gc).units.values():
+        if unit.is_on_map:
+            grid.place_unit(unit.id, unit.x, unit.y)
+
+
+def precompute_landmarks(gc: bc.GameController, budget_ms: float) -> bool:
+    """
+    Adds landmark tables to the grids of both planets until the time budget is used up.
+    Returns True once all the tables are complete.
+    """
+    deadline = time.time() + budget_ms / 1000
+    is_complete = True
+    for planet in [bc.Planet.Earth, bc.Planet.Mars]:
+        grid = get_grid(gc, planet)
+        if grid.landmarks is None:
+            grid.landmarks = LandmarkTable(grid)
+        while time.time() < deadline and grid.landmarks.add_landmark():
+            pass
+        if not grid.landmarks.is_complete():
+            is_complete = False
+    return is_complete
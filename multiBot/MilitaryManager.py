@@ -1,11 +1,18 @@
-from collections import namedtuple
+from collections import deque, namedtuple
 import battlecode as bc
 from LocationUtil import is_empty, cross_directions, find_empty_loc_near
+from MapCache import get_grid
 from enum import Enum
 import random
-from UnitController import navigate_unit_to
+from UnitController import navigate_unit_far, navigate_units_to
+from PathCache import path_cache
+from Occupancy import attack, launch_rocket, load, move_robot, unload
+from UnitSnapshot import unit_snapshot
+from Stagger import UnitStagger, is_attack_ready
+from SpatialHash import SpatialHash
+from Targeting import can_hit, expected_damage, plan_attacks
 import sys
-import time
+from typing import Deque, Dict, Set
 
 from builtins import print
 
@@ -32,55 +39,59 @@ class MilitaryManager:
     def __init__(self, gc: bc.GameController, pm: bc.PlanetMap):
         self.gc = gc
         self.pm = pm
-        self.planned_actions = []
-        self.soldiers_in_action = dict()
+        # Action id to action, in the order they were planned
+        self.planned_actions = dict()  # type: Dict[int, Action]
+        self.soldiers_in_action = dict()  # type: Dict[int, bc.MapLocation]
         self.group_ids = 0
         self.action_ids = 0
-        self.groups = dict()
-        self.next_actions = dict()
-        self.free_groups = []
+        self.groups = dict()  # type: Dict[int, Group]
+        self.next_actions = dict()  # type: Dict[int, Action]
+        # Ordered like the list they replace, the most recently freed group takes the next plan
+        self.free_groups = dict()  # type: Dict[int, None]
         if gc.team() == bc.Team.Blue:
             self.enemy_team = bc.Team.Red
         else:
             self.enemy_team = bc.Team.Blue
-        self.enemy_factories = []
-        self.enemy_workers = []
-        self.enemy_rockets = []
-        self.enemy_soldiers = []
-        self.soldiers_group = dict()
-        self.explorers = []
-        self.explorerQueue = []
-        self.rockets_in_processing = []
-        self.loaded_rockets = []
+        # Locations to plan attacks on, dicts keep them unique and in the order they were found
+        self.enemy_factories = dict()  # type: Dict[bc.MapLocation, None]
+        self.enemy_workers = dict()  # type: Dict[bc.MapLocation, None]
+        self.enemy_rockets = dict()  # type: Dict[bc.MapLocation, None]
+        self.enemy_soldiers = set()  # type: Set[bc.MapLocation]
+        # Soldier id to the id of its group, only ever changed by add_soldier and remove_soldier
+        self.soldiers_group = dict()  # type: Dict[int, int]
+        self.explorers = set()  # type: Set[int]
+        self.explorerQueue = deque()  # type: Deque[Demands]
+        self.rockets_in_processing = set()  # type: Set[int]
+        self.loaded_rockets = set()  # type: Set[int]
+        # Soldiers of free groups and explorers only get served in rounds they can act in
+        self.stagger = UnitStagger()
+        # Units we see this round by position, built once instead of sensing around every soldier
+        self.enemies = SpatialHash([], 1)
+        self.allies = SpatialHash([], 1)
 
     def move_soldiers_inside_group(self, group):
-        ret_count = 0
+        # All soldiers of the group are planned together so they do not block each other
+        orders = []
         for type in group.soldiers:
             for soldier_id in group.soldiers[type]:
-                if self.move_soldier(soldier_id):
-                    ret_count += 1
+                if soldier_id in self.soldiers_in_action:
+                    unit = unit_snapshot(self.gc).unit(soldier_id)
+                    if self.soldiers_in_action[soldier_id] is not None and \
+                                    unit.distance_squared_to(self.soldiers_in_action[soldier_id]) > unit.attack_range:
+                        orders.append((unit, self.soldiers_in_action[soldier_id]))
+                    else:
+                        self.soldiers_in_action.pop(soldier_id, None)
+        arrived = navigate_units_to(self.gc, orders)
+        ret_count = 0
+        for unit, _ in orders:
+            if arrived[unit.id]:
+                self.soldiers_in_action.pop(unit.id, None)
+            else:
+                ret_count += 1
         if ret_count > 0:
             return True
         return False
 
-    def move_soldier(self, soldier_id):
-        if soldier_id in self.soldiers_in_action:
-            unit = self.gc.unit(soldier_id)
-            if self.soldiers_in_action[soldier_id] is not None and \
-                            unit.location.map_location().distance_squared_to(
-                                self.soldiers_in_action[soldier_id]) > unit.attack_range():
-                start = time.time()
-                if navigate_unit_to(self.gc, unit, self.soldiers_in_action[soldier_id]):
-                    self.soldiers_in_action.pop(soldier_id, None)
-                    end = time.time()
-                    return False
-                else:
-                    end = time.time()
-                    return True
-            else:
-                self.soldiers_in_action.pop(soldier_id, None)
-        return False
-
     def service_groups(self):
         for group_id in self.groups:
             group = self.groups[group_id]
@@ -90,51 +101,131 @@ class MilitaryManager:
                         action = self.next_actions.pop(group_id, None)
                         self.new_action(action.action_type, action.location, action.round, action.group_id)
                     else:
-                        self.free_groups.append(group_id)
+                        self.free_group(group_id)
             else:
+                current_round = self.gc.round()
+                snapshot = unit_snapshot(self.gc)
                 for type in group.soldiers:
                     for soldier_id in group.soldiers[type]:
+                        soldier = snapshot.units.get(soldier_id)
+                        if soldier is None or not self.stagger.is_due(
+                                soldier, current_round, min(soldier.movement_heat, soldier.attack_heat)):
+                            continue
                         try:
                             if not self.fight_with_soldier(soldier_id):
                                 self.go_somewhere(soldier_id)
+                                # Nothing to fight, focus_fire still covers it while it waits
+                                self.stagger.idle(soldier_id, current_round)
                         except Exception as exc:
                             print(exc)
 
     def fight_with_soldier(self, soldier_id):
-        soldier = self.gc.unit(soldier_id)
-        for unit in self.gc.sense_nearby_units_by_team(soldier.location.map_location(), soldier.attack_range(),
-                                                       self.enemy_team):
-            if self.gc.is_attack_ready(soldier_id) and unit.team != self.gc.team() and \
-                    self.gc.can_attack(soldier_id, unit.id):
-                self.gc.attack(soldier_id, unit.id)
+        """
+        Returns whether the soldier has enemies it can hit and should hold its position, focus_fire already
+        spent its attack if it had a target worth it. A ranger with enemies only too close to hit moves on.
+        """
+        soldier = unit_snapshot(self.gc).unit(soldier_id)
+        nearby = [unit for unit in self.enemies.within(soldier.x, soldier.y, soldier.attack_range)
+                  if can_hit(soldier, unit)]
+        for unit in nearby:
+            if self.gc.is_attack_ready(soldier_id) and self.gc.can_attack(soldier_id, unit.id):
+                if attack(self.gc, soldier_id, unit.id, expected_damage(soldier, unit)):
+                    self.enemies.remove(unit)
                 return True
-        return False
+        return len(nearby) > 0
 
     def get_new_group(self):
         self.group_ids += 1
-        n_group = Group(self.group_ids, {'ranger': [], 'healer': [], 'mage': [], 'knight': []}, None)
+        n_group = Group(self.group_ids, {'ranger': set(), 'healer': set(), 'mage': set(), 'knight': set()}, None)
+        self.groups[n_group.id] = n_group
+        self.free_group(n_group.id)
         return n_group
 
+    def free_group(self, group_id):
+        self.free_groups.pop(group_id, None)
+        self.free_groups[group_id] = None
+
+    def add_soldier(self, group_id, soldier_id, soldier_type):
+        if group_id not in self.groups:
+            raise ValueError('No group {} to add soldier {} to'.format(group_id, soldier_id))
+        if soldier_id in self.soldiers_group:
+            raise ValueError('Soldier {} is already in group {}'.format(soldier_id, self.soldiers_group[soldier_id]))
+        if soldier_id in self.explorers:
+            raise ValueError('Soldier {} is an explorer'.format(soldier_id))
+        self.groups[group_id].soldiers[soldier_type].add(soldier_id)
+        self.soldiers_group[soldier_id] = group_id
+
+    def remove_soldier(self, soldier_id):
+        """
+        Takes the soldier out of its group, a group left without soldiers is disbanded.
+        Returns the soldier's type in the group or None if it was in none.
+        """
+        group_id = self.soldiers_group.pop(soldier_id, None)
+        if group_id is None:
+            return None
+        group = self.groups[group_id]
+        soldier_type = None
+        for type, soldiers in group.soldiers.items():
+            if soldier_id in soldiers:
+                soldiers.remove(soldier_id)
+                soldier_type = type
+        if soldier_type is None:
+            raise ValueError('Soldier {} is not in its group {}'.format(soldier_id, group_id))
+        # The destination belonged to the group's action
+        self.soldiers_in_action.pop(soldier_id, None)
+        if not any(group.soldiers.values()):
+            self.disband_group(group_id)
+        return soldier_type
+
+    def move_soldier(self, soldier_id, group_id):
+        if group_id not in self.groups:
+            raise ValueError('No group {} to move soldier {} to'.format(group_id, soldier_id))
+        if self.soldiers_group.get(soldier_id) == group_id:
+            return
+        if soldier_id not in self.soldiers_group:
+            raise ValueError('Soldier {} is in no group'.format(soldier_id))
+        # Disbanding the old group cannot touch the new one, they differ
+        self.add_soldier(group_id, soldier_id, self.remove_soldier(soldier_id))
+
+    def disband_group(self, group_id):
+        # Actions planned for the group are dropped when execute_actions gets to them
+        self.groups.pop(group_id, None)
+        self.free_groups.pop(group_id, None)
+        self.next_actions.pop(group_id, None)
+
+    def check_invariants(self):
+        """
+        Raises AssertionError when the soldiers, groups and explorers disagree. Costs a pass over all of them,
+        meant for debugging and the benchmark, not for every round.
+        """
+        members = dict()
+        for group_id, group in self.groups.items():
+            assert group.id == group_id, 'Group {} stored as {}'.format(group.id, group_id)
+            assert any(group.soldiers.values()), 'Group {} has no soldiers'.format(group_id)
+            for soldiers in group.soldiers.values():
+                for soldier_id in soldiers:
+                    assert soldier_id not in members, 'Soldier {} is in two groups'.format(soldier_id)
+                    members[soldier_id] = group_id
+        assert members == self.soldiers_group, 'Soldier to group index is out of date'
+        assert self.free_groups.keys() <= self.groups.keys(), 'Free groups that do not exist'
+        assert self.explorers.isdisjoint(members), 'Explorers in groups'
+
     # checks robots, creates new group and add it to free groups
     def distribute_soldiers(self):
         group = None
-        for unit in self.gc.my_units():
-            if unit.location.is_in_garrison():
+        for unit in unit_snapshot(self.gc).my_units():
+            if unit.is_in_garrison or not self.is_soldier(unit.unit_type):
+                continue
+            if unit.id in self.soldiers_group or unit.id in self.explorers:
+                continue
+            soldier_type = self.get_unit_type(unit)
+            if len(self.explorerQueue) > 0 and soldier_type == "ranger":
+                self.explorers.add(unit.id)
+                self.explorerQueue.popleft()
                 continue
-            if self.is_soldier(unit.unit_type):
-                if unit.id not in self.soldiers_group:
-                    if len(self.explorerQueue) > 0 and self.get_unit_type(
-                            unit) == "ranger" and unit.id not in self.explorers:
-                        self.explorers.append(unit.id)
-                        self.explorerQueue.pop()
-                        continue
-                    if group is None:
-                        group = self.get_new_group()
-                    group.soldiers[self.get_unit_type(unit)].append(unit.id)
-                    self.soldiers_group[unit.id] = group
-        if group is not None:
-            self.groups[group.id] = group
-            self.free_groups.append(group.id)
+            if group is None:
+                group = self.get_new_group()
+            self.add_soldier(group.id, unit.id, soldier_type)
 
     # unit_type for list
     def get_unit_type(self, unit):
@@ -172,52 +263,57 @@ class MilitaryManager:
 
     # adds new action to planned actions
     def new_action(self, action_type, location, round, group_id=None):
-        self.planned_actions.append(Action(self.get_action_id(), action_type, location, round, group_id))
+        action = Action(self.get_action_id(), action_type, location, round, group_id)
+        self.planned_actions[action.id] = action
 
     def get_action_id(self):
         self.action_ids += 1
         return self.action_ids
 
     def attack_action(self, action, group):
-        nearby = self.gc.sense_nearby_units(action.location, 4)
+        enemies = self.enemies.within(action.location.x, action.location.y, 4)
+        allies = self.allies.within(action.location.x, action.location.y, 4)
+        snapshot = unit_snapshot(self.gc)
         enemy_count = 0
         for type in group.soldiers:
             if not self.is_healer(type):
                 for soldier_id in group.soldiers[type]:
                     attacked = False
                     if soldier_id not in self.soldiers_in_action:
-                        for other in nearby:
-                            if other.team != self.gc.team():
-                                enemy_count += 1
-                                if self.gc.is_attack_ready(soldier_id) and \
-                                        self.gc.can_attack(soldier_id, other.id):
-                                    self.gc.attack(soldier_id, other.id)
-                                    attacked = True
-                                    continue
+                        for other in enemies:
+                            if other.id not in snapshot.units:
+                                # Killed earlier this round
+                                continue
+                            enemy_count += 1
+                            if self.gc.is_attack_ready(soldier_id) and \
+                                    self.gc.can_attack(soldier_id, other.id):
+                                if attack(self.gc, soldier_id, other.id,
+                                          expected_damage(snapshot.unit(soldier_id), other)):
+                                    self.enemies.remove(other)
+                                attacked = True
+                                continue
                     if not attacked:
                         pass
             else:
                 for soldier_id in group.soldiers[type]:
                     healed = False
                     if soldier_id not in self.soldiers_in_action:
-                        for other in nearby:
-                            if self.gc.is_heal_ready(soldier_id) \
-                                    and other.team == self.gc.team() and \
-                                    self.gc.can_heal(soldier_id, other.id):
+                        for other in allies:
+                            if self.gc.is_heal_ready(soldier_id) and self.gc.can_heal(soldier_id, other.id):
                                 self.gc.heal(soldier_id, other.id)
                                 healed = True
                                 continue
                     if not healed:
                         pass
         if enemy_count == 0:
-            self.planned_actions.remove(action)
-            self.free_groups.append(group.id)
+            self.planned_actions.pop(action.id, None)
+            self.free_group(group.id)
 
     def holliday_action(self, action):
-        nearby = self.gc.sense_nearby_units_by_team(action.location, 3, self.gc.team())
+        nearby = self.allies.within(action.location.x, action.location.y, 3)
         rocket = None
         for other in nearby:
-            if other.unit_type == bc.UnitType.Rocket and other.location.map_location() == action.location:
+            if other.unit_type == bc.UnitType.Rocket and (other.x, other.y) == (action.location.x, action.location.y):
                 rocket = other
         if rocket is not None:
             loaded_soldiers = 0
@@ -225,45 +321,40 @@ class MilitaryManager:
                 if (self.is_soldier(
                         near.unit_type) or near.unit_type == bc.UnitType.Worker) and near.id not in self.soldiers_in_action:
                     if self.gc.can_load(rocket.id, near.id):
-                        self.gc.load(rocket.id, near.id)
-                        if not near.unit_type == bc.UnitType.Worker:
-                            try:
-                                self.soldiers_group[near.id].soldiers[self.get_unit_type(self.gc.unit(near.id))].remove(
-                                    near.id)
-                            except Exception as exc:
-                                print(exc)
-                        self.soldiers_group.pop(near.id, None)
+                        load(self.gc, rocket.id, near.id)
+                        self.remove_soldier(near.id)
                         loaded_soldiers += 1
-            garrison = rocket.structure_garrison()
+            garrison = rocket.garrison
             if len(garrison) >= 2:
-                try:
-                    self.planned_actions.remove(action)
-                except:
-                    print("Action already removed")
-                # self.loaded_rockets(rocket.id) # TODO this will crash - list is not callable, should be remove?
-                self.rockets_in_processing.remove(rocket.id)
+                self.planned_actions.pop(action.id, None)
+                self.rockets_in_processing.discard(rocket.id)
                 self.launch_rocket(rocket.id)
         else:
-            self.planned_actions.remove(action)
+            self.planned_actions.pop(action.id, None)
 
     def execute_actions(self):
-        for action in self.planned_actions:
+        # A copy, the actions remove themselves when they are done
+        for action in list(self.planned_actions.values()):
             if action.action_type == ActionType.MARS_HOLLIDAY:
                 self.holliday_action(action)
                 continue
             group = None
             if action.group_id is not None:
-                group = self.groups[action.group_id]
+                group = self.groups.get(action.group_id)
+                if group is None:
+                    # The group was disbanded
+                    self.planned_actions.pop(action.id, None)
+                    continue
             else:
                 if len(self.free_groups) > 0:
-                    group = self.groups[self.free_groups.pop()]
+                    group = self.groups[self.free_groups.popitem()[0]]
             if group is None:
                 continue
             if action.action_type == ActionType.MOVE:
                 for type in group.soldiers:
                     for soldier_id in group.soldiers[type]:
                         self.soldiers_in_action[soldier_id] = action.location
-                self.planned_actions.remove(action)
+                self.planned_actions.pop(action.id, None)
                 if action.round == -1:
                     self.next_actions[group.id] = Action(self.get_action_id(), ActionType.ATTACK, action.location, 0,
                                                          group.id)
@@ -277,37 +368,37 @@ class MilitaryManager:
     # exploration
     def exploration(self, ranger_id):
         try:
-            ranger = self.gc.unit(ranger_id)
+            ranger = unit_snapshot(self.gc).unit(ranger_id)
             if ranger_id not in self.soldiers_in_action:
                 self.go_somewhere(ranger_id, False)
-            if navigate_unit_to(self.gc, ranger, self.soldiers_in_action[ranger_id]):
+            if navigate_unit_far(self.gc, ranger, self.soldiers_in_action[ranger_id]):
                 self.soldiers_in_action.pop(ranger_id, None)
-            for unit in self.gc.sense_nearby_units_by_team(ranger.location.map_location(), ranger.attack_range(),
-                                                           self.enemy_team):
+            for unit in self.enemies.within(ranger.x, ranger.y, ranger.attack_range):
                 if unit.unit_type == bc.UnitType.Rocket:
-                    if unit.location.map_location() not in self.enemy_rockets:
-                        self.enemy_rockets.append(unit.location.map_location())
+                    self.enemy_rockets[unit.map_location()] = None
                 elif unit.unit_type == bc.UnitType.Factory:
-                    if unit.location.map_location() not in self.enemy_factories:
-                        self.enemy_factories.append(unit.location.map_location())
+                    self.enemy_factories[unit.map_location()] = None
                 elif unit.unit_type == bc.UnitType.Worker:
-                    if unit.location.map_location() not in self.enemy_workers:
-                        self.enemy_workers.append(unit.location.map_location())
+                    self.enemy_workers[unit.map_location()] = None
                 else:
-                    self.enemy_soldiers.append(unit.location.map_location())
+                    self.enemy_soldiers.add(unit.map_location())
         except Exception as exc:
             print(exc)
             return None
 
     def explore(self):
         demands_count = 0
-        for ranger_id in self.explorers:
+        current_round = self.gc.round()
+        # A copy, dead explorers are removed on the way
+        for ranger_id in list(self.explorers):
             try:
-                ranger = self.gc.unit(ranger_id)
+                ranger = unit_snapshot(self.gc).unit(ranger_id)
+                if not self.stagger.is_due(ranger, current_round, ranger.movement_heat):
+                    continue
                 self.exploration(ranger_id)
             except Exception as exc:
                 print(exc)
-                self.explorers.remove(ranger_id)
+                self.explorers.discard(ranger_id)
                 self.explorerQueue.append(Demands.EXPLORER)
                 demands_count += 1
 
@@ -317,13 +408,13 @@ class MilitaryManager:
 
     def go_somewhere(self, unit_id, exploration=False):
         try:
-            unit = self.gc.unit(unit_id)
+            unit = unit_snapshot(self.gc).unit(unit_id)
             if exploration:
                 self.soldiers_in_action[unit_id] = self.get_random_position(self.gc.planet(), None, None)
             else:
                 d = random.choice(directions)
                 if self.gc.is_move_ready(unit.id) and self.gc.can_move(unit.id, d):
-                    self.gc.move_robot(unit.id, d)
+                    move_robot(self.gc, unit.id, d)
                     return True
             return False
         except Exception as exc:
@@ -331,18 +422,16 @@ class MilitaryManager:
             return False
 
     def make_plans(self):
-        while len(self.enemy_rockets) > 0:
-            self.new_action(ActionType.MOVE, self.enemy_rockets.pop(), -1)
-        while len(self.enemy_factories) > 0:
-            self.new_action(ActionType.MOVE, self.enemy_factories.pop(), -1)
-        while len(self.enemy_workers) > 0:
-            self.new_action(ActionType.MOVE, self.enemy_workers.pop(), -1)
+        # Newest first
+        for targets in [self.enemy_rockets, self.enemy_factories, self.enemy_workers]:
+            while len(targets) > 0:
+                self.new_action(ActionType.MOVE, targets.popitem()[0], -1)
 
     def check_rockets(self):
-        for unit in self.gc.my_units():
+        for unit in unit_snapshot(self.gc).my_units():
             if unit.unit_type == bc.UnitType.Rocket and unit.id not in self.rockets_in_processing and unit.id not in self.loaded_rockets:
-                if unit.rocket_is_used():
-                    garrison = unit.structure_garrison()
+                if unit.is_used:
+                    garrison = unit.garrison
                     max_unloads = 8
                     act_unloads = 0
                     while len(garrison) > 0:
@@ -351,25 +440,24 @@ class MilitaryManager:
                         act_unloads += 1
                         d = random.choice(directions)
                         if self.gc.can_unload(unit.id, d):
-                            self.gc.unload(unit.id, d)
+                            unload(self.gc, unit.id, d)
                 else:
-                    self.rockets_in_processing.append(unit.id)
-                    self.new_action(ActionType.MARS_HOLLIDAY, unit.location.map_location(), -2)
+                    self.rockets_in_processing.add(unit.id)
+                    self.new_action(ActionType.MARS_HOLLIDAY, unit.map_location(), -2)
 
     def launch_rocket(self, rocket_id):
-        self.gc.launch_rocket(rocket_id, self.get_next_rocket_destination())
+        launch_rocket(self.gc, rocket_id, self.get_next_rocket_destination())
 
     def get_next_rocket_destination(self) -> bc.MapLocation:
-        mars_map = self.gc.starting_map(bc.Planet.Mars)  # type: bc.PlanetMap
+        mars_map = get_grid(self.gc, bc.Planet.Mars)
         while True:
             x = random.randint(0, mars_map.width - 1)
             y = random.randint(0, mars_map.height - 1)
-            map_loc = bc.MapLocation(bc.Planet.Mars, x, y)
-            if mars_map.is_passable_terrain_at(map_loc):
-                return map_loc
+            if mars_map.is_passable(x, y):
+                return bc.MapLocation(bc.Planet.Mars, x, y)
 
     def get_random_position(self, planet, location=None, radius=None) -> bc.MapLocation:
-        map = self.gc.starting_map(planet)  # type: bc.PlanetMap
+        map = get_grid(self.gc, planet)
         min_x, min_y, max_x, max_y = self.get_random_parameters(location, radius, map)
         if radius is not None:
             max_tries = radius * 2
@@ -381,10 +469,9 @@ class MilitaryManager:
                 min_x, min_y, max_x, max_y = self.get_random_parameters(None, None, map)
             x = random.randint(min_x, max_x)
             y = random.randint(min_y, max_y)
-            map_loc = bc.MapLocation(planet, x, y)
             act_tries += 1
-            if map.is_passable_terrain_at(map_loc):
-                return map_loc
+            if map.is_passable(x, y):
+                return bc.MapLocation(planet, x, y)
 
     def get_random_parameters(self, location, radius, map):
         if location is not None and radius is not None:
@@ -411,33 +498,41 @@ class MilitaryManager:
             max_y = map.height - 1
         return min_x, min_y, max_x, max_y
 
-    def attack_when_possible(self):
-        for unit in self.gc.my_units():
-            if (not self.gc.is_attack_ready(unit.id)
-                or not unit.location.is_on_map()):
+    def focus_fire(self):
+        attackers = [unit for unit in unit_snapshot(self.gc).my_units()
+                     if unit.attack_range > 0 and unit.damage > 0 and is_attack_ready(unit)]
+        # Only the units with an enemy in range are left to plan for and ask the engine about
+        for attacker, target, damage in plan_attacks(self.enemies.within_each(attackers)):
+            if not self.gc.is_attack_ready(attacker.id) or not self.gc.can_attack(attacker.id, target.id):
                 continue
-            nearby = self.gc.sense_nearby_units_by_team(
-                unit.location.map_location(),
-                unit.attack_range(),
-                self.enemy_team
-            )
-            for n in nearby:
-                if self.gc.can_attack(unit.id, n.id):
-                    self.gc.attack(unit.id, n.id)
-                    break
+            if attack(self.gc, attacker.id, target.id, damage):
+                self.enemies.remove(target)
 
     def remove_dead_soldiers(self):
-        my_unit_ids = [u.id for u in self.gc.my_units()]
-        for k, g in self.groups.items():
-            self.groups[k] = Group(g.id, {t: [x for x in v if x in my_unit_ids] for t, v in g.soldiers.items()},
-                                   g.action)
-
-    def update(self):
+        my_unit_ids = {u.id for u in unit_snapshot(self.gc).my_units()}
+        path_cache.prune(my_unit_ids)
+        self.stagger.prune(my_unit_ids)
+        # One set lookup per soldier, the groups of the dead soldiers are the only ones changed
+        for soldier_id in self.soldiers_group.keys() - my_unit_ids:
+            self.remove_soldier(soldier_id)
+
+    def index_units(self):
+        snapshot = unit_snapshot(self.gc)
+        allies = snapshot.my_units()
+        enemies = [unit for unit in snapshot.units.values() if unit.team == self.enemy_team]
+        self.enemies = SpatialHash.build(enemies, allies)
+        self.allies = SpatialHash.build(allies, allies)
+
+    def update_state(self):
         self.remove_dead_soldiers()
-        self.check_rockets()
-        self.explore()
         self.distribute_soldiers()
+        self.index_units()
+
+    def fight(self):
+        # Attacks first, the kills free the squares and the soldiers without a target can still move after
+        self.focus_fire()
+        # Rocket trips and attack plans are carried out in the same turn they are made
+        self.check_rockets()
         self.make_plans()
         self.execute_actions()
         self.service_groups()
-        self.attack_when_possible()
@@ -0,0 +1,88 @@
+"""
+Our own actions that change the board within a turn. Each one updates the occupancy index of the current
+planet's grid and the unit snapshot, so is_empty, the searches and the managers see the board as it is
+without asking the engine.
+The grid is fetched before the action, otherwise a refresh at the start of a round would count the action twice.
+"""
+
+import battlecode as bc
+from Grid import DIRECTION_OFFSETS, Grid
+from MapCache import get_grid
+from UnitSnapshot import snapshot
+
+
+def move_robot(gc: bc.GameController, robot_id: int, direction: bc.Direction) -> None:
+    grid = get_grid(gc, gc.planet())
+    gc.move_robot(robot_id, direction)
+    if robot_id in grid.positions:
+        x, y = grid.coords(grid.positions[robot_id])
+        dx, dy = DIRECTION_OFFSETS[direction]
+        grid.remove_unit(robot_id)
+        grid.place_unit(robot_id, x + dx, y + dy)
+        snapshot.move(robot_id, dx, dy)
+
+
+def attack(gc: bc.GameController, robot_id: int, target_id: int, damage: int) -> bool:
+    """
+    Attacks with the damage the target is expected to take, returns whether that kills it.
+    """
+    grid = get_grid(gc, gc.planet())
+    gc.attack(robot_id, target_id)
+    if snapshot.damage(target_id, damage):
+        grid.remove_unit(target_id)
+        return True
+    return False
+
+
+def blueprint(gc: bc.GameController, worker_id: int, structure_type: bc.UnitType, direction: bc.Direction) -> None:
+    grid = get_grid(gc, gc.planet())
+    gc.blueprint(worker_id, structure_type, direction)
+    unit = place_new_unit(gc, grid, worker_id, direction)
+    if unit is not None:
+        snapshot.add(unit)
+
+
+def replicate(gc: bc.GameController, worker_id: int, direction: bc.Direction) -> None:
+    grid = get_grid(gc, gc.planet())
+    gc.replicate(worker_id, direction)
+    unit = place_new_unit(gc, grid, worker_id, direction)
+    if unit is not None:
+        snapshot.add(unit)
+
+
+def unload(gc: bc.GameController, structure_id: int, direction: bc.Direction) -> None:
+    grid = get_grid(gc, gc.planet())
+    gc.unload(structure_id, direction)
+    unit = place_new_unit(gc, grid, structure_id, direction)
+    if unit is not None:
+        snapshot.unload(structure_id, unit)
+
+
+def load(gc: bc.GameController, structure_id: int, robot_id: int) -> None:
+    grid = get_grid(gc, gc.planet())
+    gc.load(structure_id, robot_id)
+    grid.remove_unit(robot_id)
+    snapshot.load(structure_id, robot_id)
+
+
+def launch_rocket(gc: bc.GameController, rocket_id: int, location: bc.MapLocation) -> None:
+    grid = get_grid(gc, gc.planet())
+    gc.launch_rocket(rocket_id, location)
+    grid.remove_unit(rocket_id)
+    snapshot.launch(rocket_id)
+
+
+def place_new_unit(gc: bc.GameController, grid: Grid, source_id: int, direction: bc.Direction) -> bc.Unit:
+    """
+    Adds the unit that appeared next to the source unit to the grid and returns it, its id is only known to the engine.
+    """
+    if source_id not in grid.positions:
+        return None
+    x, y = grid.coords(grid.positions[source_id])
+    dx, dy = DIRECTION_OFFSETS[direction]
+    location = bc.MapLocation(gc.planet(), x + dx, y + dy)
+    if not gc.has_unit_at_location(location):
+        return None
+    unit = gc.sense_unit_at_location(location)
+    grid.place_unit(unit.id, x + dx, y + dy)
+    return unit
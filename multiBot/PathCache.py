@@ -0,0 +1,106 @@
+from typing import Callable, Dict, Iterable, List, Set, Tuple
+from Grid import Grid
+from GridSearch import grid_a_star, SearchBudget
+
+# How many upcoming steps of a cached path are checked for blocking units every turn
+LOOKAHEAD = 3
+# Number of turns a goal found unreachable is not searched again from the cells the search covered
+UNREACHABLE_TURNS = 10
+
+
+class PathCache:
+    """
+    Remembers the remaining path of every unit so a unit walking across the map plans once instead of every turn.
+    A path is advanced as the unit moves along it, repaired locally when a unit blocks one of the next LOOKAHEAD
+    steps and replanned only when the goal changes, the unit left the path or reached the end of a partial path.
+    """
+
+    def __init__(self) -> None:
+        self.paths = dict()  # type: Dict[int, Tuple[Tuple[int, int], List[Tuple[int, int]]]]
+        # Goal -> (round the entry expires, cells from which the goal was found unreachable)
+        self.unreachable = dict()  # type: Dict[Tuple[int, int], Tuple[int, Set[int]]]
+
+    def has_path(self, unit_id: int, goal) -> bool:
+        return unit_id in self.paths and self.paths[unit_id][0] == goal
+
+    def forget(self, unit_id: int) -> None:
+        self.paths.pop(unit_id, None)
+
+    def prune(self, alive_ids: Iterable[int]) -> None:
+        alive_ids = set(alive_ids)
+        for unit_id in [u for u in self.paths if u not in alive_ids]:
+            self.paths.pop(unit_id)
+
+    def is_unreachable(self, grid, start, goal, current_round):
+        # type: (Grid, Tuple[int, int], Tuple[int, int], int) -> bool
+        if goal not in self.unreachable:
+            return False
+        expires, cells = self.unreachable[goal]
+        if current_round >= expires:
+            del self.unreachable[goal]
+            return False
+        return grid.index(start[0], start[1]) in cells
+
+    def next_step(self, grid, unit_id, start, goal, current_round, search=grid_a_star, budget=None):
+        # type: (Grid, int, Tuple[int, int], Tuple[int, int], int, Callable, SearchBudget) -> Tuple[int, int]
+        """
+        Returns the next cell the unit should move to or None if it is at the goal or the goal is unreachable.
+        The search is grid_a_star or grid_jps, both return the full list of cells, or the way toward the goal
+        when the budget runs out. A goal the search could not reach is skipped for UNREACHABLE_TURNS.
+        """
+        if self.is_unreachable(grid, start, goal, current_round):
+            self.forget(unit_id)
+            return None
+        path = None
+        if self.has_path(unit_id, goal):
+            path = self.advance(self.paths[unit_id][1], start)
+        if path is not None and len(path) == 1 and path[0] != goal:
+            # The end of a partial path, continue the search from here
+            path = None
+        if path is not None:
+            path = self.repair(grid, path, search, budget)
+        if path is None:
+            stats = dict()
+            path = search(grid, start, goal, stats, budget)
+            if 'component' in stats:
+                self.unreachable[goal] = (current_round + UNREACHABLE_TURNS, stats['component'])
+        if path is None:
+            self.forget(unit_id)
+            return None
+
+        self.paths[unit_id] = (goal, path)
+        if len(path) > 1:
+            return path[1]
+        return None
+
+    @staticmethod
+    def advance(path, position):  # type: (List[Tuple[int, int]], Tuple[int, int]) -> List[Tuple[int, int]]
+        for i, node in enumerate(path[:LOOKAHEAD + 1]):
+            if node == position:
+                return path[i:]
+        return None
+
+    @staticmethod
+    def repair(grid, path, search=grid_a_star, budget=None):
+        # type: (Grid, List[Tuple[int, int]], Callable, SearchBudget) -> List[Tuple[int, int]]
+        """
+        Reroutes around units blocking the next few steps by planning a detour to the first free cell after them.
+        A detour cut short by the budget replaces the whole path.
+        """
+        last_blocked = None
+        for i in range(1, min(len(path), LOOKAHEAD + 1)):
+            if not grid.is_free(path[i][0], path[i][1]):
+                last_blocked = i
+        if last_blocked is None:
+            return path
+        if last_blocked + 1 >= len(path):
+            return None
+        detour = search(grid, path[0], path[last_blocked + 1], None, budget)
+        if detour is None:
+            return None
+        if detour[-1] != path[last_blocked + 1]:
+            return detour
+        return detour + path[last_blocked + 2:]
+
+
+path_cache = PathCache()
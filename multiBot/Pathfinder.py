@@ -1,51 +1,28 @@
 import battlecode as bc
-from PriorityQueue import PriorityQueue
-import math
-from LocationUtil import is_empty
+from typing import Callable, List, Tuple
+from GridSearch import grid_a_star, grid_jps, SearchBudget
+from MapCache import get_grid
 
-directions = list(bc.Direction)
+# A single search may use at most this share of the remaining time pool and never more than MAX_SEARCH_MS
+TIME_LEFT_SHARE = 1 / 100
+MAX_SEARCH_MS = 5
+# and never expands more than a quarter of the largest map
+MAX_SEARCH_EXPANSIONS = 625
 
 
-def a_star_search(gc, planet_map, start, goal):
-    frontier = PriorityQueue()
-    entry = (start.x, start.y)
-    frontier.put(entry, 0)
-    came_from = {entry: None}
-    cost_so_far = {entry: 0}
+def search_budget(gc: bc.GameController) -> SearchBudget:
+    """
+    Budget of one search derived from the time left, so one bad goal cannot eat the whole turn.
+    """
+    return SearchBudget(MAX_SEARCH_EXPANSIONS, min(MAX_SEARCH_MS, gc.get_time_left_ms() * TIME_LEFT_SHARE))
 
-    is_path_found = False
 
-    while not frontier.empty():
-        current_entry = frontier.get()
-        current_ml = bc.MapLocation(gc.planet(), current_entry[0], current_entry[1])
-        if current_ml == goal:
-            is_path_found = True
-            break
+def a_star_search(gc, planet_map, start, goal, search=grid_a_star, budget=None):
+    # type: (bc.GameController, bc.PlanetMap, bc.MapLocation, bc.MapLocation, Callable, SearchBudget) -> List[Tuple[int, int]]
+    grid = get_grid(gc, planet_map.planet)
+    return search(grid, (start.x, start.y), (goal.x, goal.y), None, budget)
 
-        for d in directions:
-            next_ml = current_ml.add(d)
-            next_entry = (next_ml.x, next_ml.y)
-            new_cost = cost_so_far[current_entry] + 1
-            if (is_empty(gc, planet_map, next_ml)
-                    and (next_entry not in cost_so_far
-                         or new_cost < cost_so_far[next_entry])):
-                cost_so_far[next_entry] = new_cost
-                priority = new_cost + h(goal, next_ml)
-                frontier.put(next_entry, priority)
-                came_from[next_entry] = current_entry
 
-    if not is_path_found:
-        return None
-
-    node = (goal.x, goal.y)
-    path = [node]
-    while not (node[0] == start.x and node[1] == start.y):
-        node_from = came_from[node]
-        path.append(node_from)
-        node = node_from
-
-    return reversed(path)
-
-
-def h(start, end):
-    return math.sqrt(start.distance_squared_to(end))
+def jump_point_search(gc, planet_map, start, goal, budget=None):
+    # type: (bc.GameController, bc.PlanetMap, bc.MapLocation, bc.MapLocation, SearchBudget) -> List[Tuple[int, int]]
+    return a_star_search(gc, planet_map, start, goal, grid_jps, budget)
@@ -1,12 +1,21 @@
 from collections import namedtuple
 import battlecode as bc
-import sys
 import random
 from LocationUtil import is_empty, cross_directions, find_empty_loc_near
-from HashableMapLocation import HashableMapLocation
+from enum import Enum
 from functools import reduce
-from Pathfinder import a_star_search
-from typing import List, Dict, NamedTuple
+from Assignment import solve_assignment, INFEASIBLE
+from FlowField import flow_fields, UNREACHABLE
+from Grid import OFFSET_TO_DIRECTION
+from KarboniteField import KarboniteField
+from MapCache import starting_map, get_grid
+from PathCache import path_cache
+from Occupancy import blueprint, move_robot, unload
+from GridSearch import grid_a_star
+from Pathfinder import search_budget
+from Stagger import is_move_ready
+from typing import List, Dict, NamedTuple, Tuple
+from UnitSnapshot import UnitRecord, unit_snapshot
 
 from UnitController import navigate_unit_to
 
@@ -19,18 +28,34 @@ class Project:
         self.building_type = building_type  # type: bc.UnitType
 
 
+class TaskType(Enum):
+    BLUEPRINT = 0
+    BUILD = 1
+    REPAIR = 2
+    MINE = 3
+
+
+# Target is the project location for blueprints and builds, the structure id for repairs and the cell for mining
+WorkerTask = namedtuple('WorkerTask', ['task_type', 'x', 'y', 'target'])
+
 directions = list(bc.Direction)
+# Workers building one blueprint at a time
+BUILDERS_PER_PROJECT = 4
+# Added to the walking distance of mining, so every building task that can be reached is taken first
+MINING_PENALTY = 1000
 
 
 class ProductionManager:
     def __init__(self, gc: bc.GameController) -> None:
         self.gc = gc  # type: bc.GameController
-        self.factories = []  # type: List[bc.Unit]
-        self.rockets = []  # type: List[bc.Unit]
-        self.idle_workers = []  # type: List[bc.Unit]
-        self.figters = []  # type: List[bc.Unit]
-        self.projects = dict()  # type: Dict[HashableMapLocation, Project]
-        self.karbonite_locations = self.initialize_karbonite_locations()  # type: List[List[int]]
+        self.factories = []  # type: List[UnitRecord]
+        self.rockets = []  # type: List[UnitRecord]
+        self.idle_workers = []  # type: List[UnitRecord]
+        self.figters = []  # type: List[UnitRecord]
+        self.units = []  # type: List[UnitRecord]
+        self.projects = dict()  # type: Dict[bc.MapLocation, Project]
+        self.karbonite_field = KarboniteField.from_planet_map(starting_map(gc, gc.planet()))  # type: KarboniteField
+        self.karbonite_field.index_nearest(get_grid(gc, gc.planet()))
         self.fighter_types = [bc.UnitType.Ranger, bc.UnitType.Knight, bc.UnitType.Mage, bc.UnitType.Healer]
         self.expected_unit_ratios = {
             bc.UnitType.Worker: 25,
@@ -42,19 +67,9 @@ class ProductionManager:
         # Normalize ratios in case our values do not add up to 100
         self.normalize_ratios(self.expected_unit_ratios)
         self.current_unit_ratios = dict()  # type: Dict[bc.UnitType, float]
-
-    def initialize_karbonite_locations(self):
-        starting_earth_map = self.gc.starting_map(bc.Planet.Earth)  # type: bc.PlanetMap
-        width = starting_earth_map.width
-        height = starting_earth_map.height
-        result = [[0 for _ in range(height)] for _ in range(width)]
-        for i in range(width):
-            for j in range(height):
-                map_location = bc.MapLocation(bc.Planet.Earth, i, j)  # type: bc.MapLocation
-                initial_karbonite = starting_earth_map.initial_karbonite_at(map_location)
-                if initial_karbonite > 0:
-                    result[i][j] = initial_karbonite
-        return result
+        # Task of every idle worker this turn, None for the ones left to mine their nearest deposit
+        self.worker_orders = []  # type: List[Tuple[UnitRecord, WorkerTask]]
+        self.orders_round = None  # type: int
 
     def available_karbonite(self) -> int:
         return self.gc.karbonite() - reduce(
@@ -63,7 +78,7 @@ class ProductionManager:
             0
         )
 
-    def update(self) -> None:
+    def update_state(self) -> None:
         print('--- Production manager update')
         print(f'Karbonite: {self.gc.karbonite()}')
         print(f'Available karbonite: {self.available_karbonite()}')
@@ -71,35 +86,30 @@ class ProductionManager:
 
         self.update_projects()
         self.update_units()
-        self.manage_production()
         self.update_karbonite()
 
     def update_projects(self) -> None:
         for f in self.factories + self.rockets:
-            loc = HashableMapLocation(f.location.map_location())
-            if f.structure_is_built() and loc in self.projects:
-                print(f'Project complete at {f.location.map_location()}')
+            loc = f.map_location()
+            if f.is_built and loc in self.projects:
+                print(f'Project complete at {f.map_location()}')
                 self.projects.pop(loc)
         for p in self.projects.values():
             p.workers_assigned = 0
 
     def update_karbonite(self):
-        for i in range(len(self.karbonite_locations)):
-            for j in range(len(self.karbonite_locations[i])):
-                current_location = bc.MapLocation(bc.Planet.Earth, i, j)
-                try:
-                    current_carbonite = self.gc.karbonite_at(current_location)
-                    self.karbonite_locations[i][j] = current_carbonite
-                except Exception as e:
-                    assert True
+        self.karbonite_field.update(self.gc, self.units)
 
     def update_units(self) -> None:
         self.idle_workers = []
         self.factories = []
-        for unit in self.gc.my_units():
+        self.rockets = []
+        self.figters = []
+        self.units = unit_snapshot(self.gc).my_units()
+        for unit in self.units:
             if unit.unit_type == bc.UnitType.Factory:
                 self.factories.append(unit)
-            elif unit.unit_type == bc.UnitType.Worker and unit.location.is_on_map():
+            elif unit.unit_type == bc.UnitType.Worker and unit.is_on_map:
                 self.idle_workers.append(unit)
             elif unit.unit_type == bc.UnitType.Rocket:
                 self.rockets.append(unit)
@@ -111,7 +121,6 @@ class ProductionManager:
     def manage_production(self) -> None:
         self.produce_units()
         self.build_projects()
-        self.manage_workers()
 
     def produce_units(self) -> None:
         if self.should_build_rocket():
@@ -123,12 +132,12 @@ class ProductionManager:
                 if self.gc.can_produce_robot(f.id, u):
                     self.gc.produce_robot(f.id, u)
                     break
-            garrison = f.structure_garrison()
+            garrison = f.garrison
             if len(garrison) > 0:
                 d = random.choice(directions)
                 if self.gc.can_unload(f.id, d):
                     print('Unloaded a Ranger!')
-                    self.gc.unload(f.id, d)
+                    unload(self.gc, f.id, d)
 
     def get_unit_priority(self) -> List[bc.UnitType]:
         self.update_unit_ratios()
@@ -141,7 +150,7 @@ class ProductionManager:
 
     def update_unit_ratios(self) -> None:
         self.current_unit_ratios = {k: 0 for k in list(bc.UnitType)}  # type: Dict[bc.UnitType, float]
-        for unit in self.gc.my_units():
+        for unit in self.units:
             if unit.unit_type in self.current_unit_ratios:
                 self.current_unit_ratios[unit.unit_type] += 1
             else:
@@ -162,13 +171,13 @@ class ProductionManager:
 
     def build_projects(self) -> None:
         while self.should_build_rocket():
-            if not self.available_karbonite() >= bc.UnitType.Rocket.blueprint_cost():
+            if not self.available_karbonite() >= self.gc.unit_type_stats(bc.UnitType.Rocket).blueprint_cost:
                 break
             if not self.create_build_project(bc.UnitType.Rocket):
                 break
 
         while not self.should_build_rocket() and self.should_build_factory():
-            if not self.available_karbonite() >= bc.UnitType.Factory.blueprint_cost():
+            if not self.available_karbonite() >= self.gc.unit_type_stats(bc.UnitType.Factory).blueprint_cost:
                 break
             if not self.create_build_project(bc.UnitType.Factory):
                 break
@@ -177,8 +186,8 @@ class ProductionManager:
         print('Creating factory build project')
         next_loc = self.get_next_build_loc()
         if next_loc is not None:
-            self.projects[HashableMapLocation(next_loc)] = Project(
-                building_type.blueprint_cost(),
+            self.projects[next_loc] = Project(
+                self.gc.unit_type_stats(building_type).blueprint_cost,
                 False,
                 0,
                 building_type
@@ -188,88 +197,118 @@ class ProductionManager:
             print('No available spcae for build found')
             return False
 
-    def manage_workers(self) -> None:
+    def manage_builders(self) -> None:
+        """
+        Assigns the workers to their tasks and runs the building and repair tasks, the miners run separately.
+        """
+        self.worker_orders = []
+        self.orders_round = self.gc.round()
         if len(self.idle_workers) == 0:
             print('No workers found')
             return
 
-        # Assign a worker to each project
         print('Managing workers')
-        self.build_incomplete_projects()
-
-        self.assign_builders()
-        self.assign_miners()
+        self.assign_workers()
+        for worker, task in self.worker_orders:
+            if task is not None and task.task_type != TaskType.MINE:
+                self.execute_task(worker, task)
         # Assign remaining idle workers
         self.assign_idle_workers()
 
-    def build_incomplete_projects(self) -> None:
-        if len(self.idle_workers) == 0:
+    def manage_miners(self) -> None:
+        # Orders of an earlier turn hold stale positions, the miners wait for this turn's assignment
+        if self.orders_round != self.gc.round():
             return
+        for worker, task in self.worker_orders:
+            if task is None:
+                self.mine(worker, self.find_closest_karbonite(worker.map_location()))
+            elif task.task_type == TaskType.MINE:
+                self.execute_task(worker, task)
+
+    def assign_workers(self) -> None:
+        """
+        Assigns all the workers to projects, repairs and deposits with one assignment solve by walking distance.
+        Workers left without a task mine their nearest deposit.
+        """
+        grid = get_grid(self.gc, self.gc.planet())
+        tasks = self.get_worker_tasks()
+        worker_cells = [grid.index(worker.x, worker.y) for worker in self.idle_workers]
+        fields = {(t.x, t.y): flow_fields.field(grid, (t.x, t.y)) for t in tasks}
+        costs = [[self.task_cost(fields[(t.x, t.y)][cell], t) for t in tasks] for cell in worker_cells]
+
+        self.worker_orders = [(worker, None if task_idx is None else tasks[task_idx])
+                              for worker, task_idx in zip(self.idle_workers, solve_assignment(costs))]
+
+    def get_worker_tasks(self) -> List[WorkerTask]:
+        tasks = []
+        for p_loc, project in self.projects.items():
+            x, y = p_loc.x, p_loc.y
+            if not project.is_in_progress:
+                tasks.append(WorkerTask(TaskType.BLUEPRINT, x, y, p_loc))
+            else:
+                tasks += [WorkerTask(TaskType.BUILD, x, y, p_loc)] * (BUILDERS_PER_PROJECT - project.workers_assigned)
+        for structure in self.factories + self.rockets:
+            if (structure.is_on_map and structure.is_built
+                    and structure.health < structure.max_health):
+                tasks.append(WorkerTask(TaskType.REPAIR, structure.x, structure.y, structure.id))
+        # The deposits nearest to the workers, the solver spreads the workers over them
+        width = self.karbonite_field.width
+        deposits = set()
+        for worker in self.idle_workers:
+            nearest = self.karbonite_field.nearest.nearest(worker.x, worker.y)
+            if nearest is not None:
+                deposits.add(nearest[0])
+        tasks += [WorkerTask(TaskType.MINE, d % width, d // width, d) for d in deposits]
+        return tasks
 
-        for p_loc, project in {k: v for k, v in self.projects.items() if not v.is_in_progress}.items():
-            worker = min(
-                self.idle_workers,
-                key=lambda w: w.location.map_location().distance_squared_to(p_loc.map_location)
-            )
-            # print(f'Closest worker to project {p_loc.map_location} is {worker.location.map_location()}')
-            self.idle_workers.remove(worker)
-            # Send this worker to build
-            worker_loc = worker.location.map_location()
-            if not worker_loc.is_adjacent_to(p_loc.map_location):
-                # Worker is too far, move it closer
-                self.move_close_to(worker, p_loc.map_location)
-
-            if worker_loc.is_adjacent_to(p_loc.map_location):
-                # print('Worker is close enough')
-                # Worker is close enough and can build
-                d = worker_loc.direction_to(p_loc.map_location)
-                if (self.gc.karbonite() > project.building_type.blueprint_cost()
-                        and self.gc.can_blueprint(worker.id, project.building_type, d)):
-                    self.gc.blueprint(worker.id, project.building_type, d)
-                    self.projects[p_loc].is_in_progress = True
-                    self.projects[p_loc].workers_assigned += 1
+    @staticmethod
+    def task_cost(distance: int, task: WorkerTask) -> int:
+        if distance == UNREACHABLE:
+            return INFEASIBLE
+        # Any building task goes before mining
+        return distance + (MINING_PENALTY if task.task_type == TaskType.MINE else 0)
+
+    def execute_task(self, worker: UnitRecord, task: WorkerTask) -> None:
+        target_location = bc.MapLocation(self.gc.planet(), task.x, task.y)
+        if task.task_type == TaskType.MINE:
+            self.mine(worker, target_location)
+            return
+        if task.task_type != TaskType.REPAIR:
+            self.projects[task.target].workers_assigned += 1
+
+        worker_loc = worker.map_location()
+        if not worker_loc.is_adjacent_to(target_location):
+            # Worker is too far, move it closer
+            self.move_close_to(worker, target_location)
+            return
+
+        # Worker is close enough
+        if task.task_type == TaskType.BLUEPRINT:
+            project = self.projects[task.target]
+            d = worker_loc.direction_to(target_location)
+            if (self.gc.karbonite() > self.gc.unit_type_stats(project.building_type).blueprint_cost
+                    and self.gc.can_blueprint(worker.id, project.building_type, d)):
+                blueprint(self.gc, worker.id, project.building_type, d)
+                project.is_in_progress = True
+        elif task.task_type == TaskType.BUILD:
+            self.try_to_build_at(worker, target_location)
+        elif self.gc.can_repair(worker.id, task.target):
+            self.gc.repair(worker.id, task.target)
 
     def assign_idle_workers(self) -> None:
         pass
 
-    def assign_builders(self):
-        # print(f'--- Assign builders')
-        for k, p in self.projects.items():
-            while p.is_in_progress and p.workers_assigned < 4 and len(self.idle_workers) > 0:
-                # print(f'--- Workers assigned = {p.workers_assigned}, idle: {len(self.idle_workers)}')
-                worker = min(
-                    self.idle_workers,
-                    key=lambda w: w.location.map_location().distance_squared_to(k.map_location)
-                )
-                p.workers_assigned += 1
-                self.idle_workers.remove(worker)
-                if not worker.location.map_location().is_adjacent_to(k.map_location):
-                    # Worker is too far, move it closer
-                    self.move_close_to(worker, k.map_location)
-                if worker.location.map_location().is_adjacent_to(k.map_location):
-                    # Worker is close enough and can build
-                    self.try_to_build_at(worker, k.map_location)
-
-    def assign_miners(self) -> None:
-        for miner in self.idle_workers:
-            miner_location = miner.location.map_location()
-            closest_karbonite_location = self.find_closest_karbonite(miner_location)
-            if miner_location == closest_karbonite_location:
-                # print(f'Worker {miner.id} is already at karbonite location -> {miner_location} ')
-                self.harvest(miner, closest_karbonite_location)
-            else:
-                # print(f'navigate to {closest_karbonite_location}')
-                reached_carbonite = navigate_unit_to(self.gc, miner, closest_karbonite_location)
-                if reached_carbonite:
-                    self.harvest(miner, closest_karbonite_location)
-                else:
-                    pass
-                    # print(
-                    #     f'Worker {miner.id} at {miner_location} '
-                    #     f'navigating to carbonite at {closest_karbonite_location}'
-                    # )
-
-    def try_to_build_at(self, worker: bc.Unit, p_loc: bc.MapLocation) -> None:
+    def mine(self, miner: UnitRecord, karbonite_location: bc.MapLocation) -> None:
+        if (miner.x, miner.y) == (karbonite_location.x, karbonite_location.y):
+            # print(f'Worker {miner.id} is already at karbonite location -> {miner.map_location()} ')
+            self.harvest(miner, karbonite_location)
+        else:
+            # print(f'navigate to {karbonite_location}')
+            reached_carbonite = navigate_unit_to(self.gc, miner, karbonite_location)
+            if reached_carbonite:
+                self.harvest(miner, karbonite_location)
+
+    def try_to_build_at(self, worker: UnitRecord, p_loc: bc.MapLocation) -> None:
         units = self.gc.sense_nearby_units(p_loc, 1)
         for building in units:
             if self.gc.can_build(worker.id, building.id):
@@ -277,43 +316,46 @@ class ProductionManager:
                 self.gc.build(worker.id, building.id)
                 break
 
-    def move_close_to(self, worker: bc.Unit, p_loc: bc.MapLocation) -> None:
-        worker_loc = worker.location.map_location()
-        loc_near = find_empty_loc_near(self.gc, self.gc.starting_map(bc.Planet.Earth), p_loc)
-        if loc_near is not None:
-            # print(f'Try to move worker from {worker.location.map_location()} to {loc_near}')
-            path_to_loc = a_star_search(
-                self.gc,
-                self.gc.starting_map(bc.Planet.Earth),
-                worker_loc,
-                loc_near
+    def move_close_to(self, worker: UnitRecord, p_loc: bc.MapLocation, search=grid_a_star) -> None:
+        if not is_move_ready(worker):
+            return
+        worker_loc = worker.map_location()
+        loc_near = find_empty_loc_near(self.gc, starting_map(self.gc, self.gc.planet()), p_loc)
+        if loc_near is not None and self.gc.is_move_ready(worker.id):
+            # print(f'Try to move worker from {worker.map_location()} to {loc_near}')
+            start = (worker_loc.x, worker_loc.y)
+            next_node = path_cache.next_step(
+                get_grid(self.gc, self.gc.planet()),
+                worker.id,
+                start,
+                (loc_near.x, loc_near.y),
+                self.gc.round(),
+                search,
+                search_budget(self.gc)
             )
-            if path_to_loc is not None:
-                path_to_loc = list(path_to_loc)
+            if next_node is None:
+                print(f'Path not found {worker.map_location()} to {loc_near}')
             else:
-                print(f'Path not found {worker.location.map_location()} to {loc_near}')
-            if path_to_loc is not None and len(path_to_loc) > 1:
-                # print(f'Path found {path_to_loc}')
-                next_node = path_to_loc[1]
-                next_dir = worker_loc.direction_to(bc.MapLocation(self.gc.planet(), next_node[0], next_node[1]))
-                if self.gc.can_move(worker.id, next_dir) and self.gc.is_move_ready(worker.id):
+                # print(f'Path found, next node {next_node}')
+                next_dir = bc.Direction(OFFSET_TO_DIRECTION[(next_node[0] - start[0], next_node[1] - start[1])])
+                if self.gc.can_move(worker.id, next_dir):
                     # print('Worker move')
-                    self.gc.move_robot(worker.id, next_dir)
+                    move_robot(self.gc, worker.id, next_dir)
 
     def get_next_build_loc(self) -> bc.MapLocation:
         # No factories yet, find a neraby place
         if len(self.factories) == 0:
             for w in self.idle_workers:
                 for d in bc.Direction:
-                    new_loc = w.location.map_location().add(d)
-                    if is_empty(self.gc, self.gc.starting_map(bc.Planet.Earth), new_loc):
+                    new_loc = w.map_location().add(d)
+                    if is_empty(self.gc, starting_map(self.gc, self.gc.planet()), new_loc):
                         return new_loc
         # Find a place close to other factories
         else:
             for f in self.factories + self.rockets:
                 for d in cross_directions:
-                    new_loc = f.location.map_location().add(d)
-                    if is_empty(self.gc, self.gc.starting_map(bc.Planet.Earth), new_loc):
+                    new_loc = f.map_location().add(d)
+                    if is_empty(self.gc, starting_map(self.gc, self.gc.planet()), new_loc):
                         return new_loc
         return None
 
@@ -326,25 +368,23 @@ class ProductionManager:
                 and len(self.idle_workers) > 5
                 and len(self.figters) > 5)
 
-    def harvest(self, worker, karbonite_location):  # type: (bc.Unit, bc.MapLocation) -> None
-        worker_location = worker.location.map_location()
+    def harvest(self, worker, karbonite_location):  # type: (UnitRecord, bc.MapLocation) -> None
+        worker_location = worker.map_location()
         direction = worker_location.direction_to(karbonite_location)
         if self.gc.can_harvest(worker.id, direction):
             self.gc.harvest(worker.id, direction)
+            self.karbonite_field.record_harvest(karbonite_location.x, karbonite_location.y,
+                                                worker.harvest_amount)
             print(f'Worker {worker.id} at {worker_location} HARVESTING at {karbonite_location}')
         else:
             print(f'Worker {worker.id} at {worker_location} CANNOT harvest at {karbonite_location}')
 
     def find_closest_karbonite(self, location):  # type: (bc.MapLocation) -> bc.MapLocation
-        closest_location = location  # type: bc.MapLocation
-        closest_distance = sys.maxsize
-
-        for i in range(len(self.karbonite_locations)):
-            for j in range(len(self.karbonite_locations[i])):
-                karbonite_location = bc.MapLocation(location.planet, i, j)
-                potential_distance = karbonite_location.distance_squared_to(location)
-                if self.karbonite_locations[i][j] > 0 and potential_distance < closest_distance:
-                    closest_distance = potential_distance
-                    closest_location = karbonite_location
-
-        return closest_location
+        """
+        Returns the deposit closest to walk to, or the location itself if no deposit can be reached.
+        """
+        nearest = self.karbonite_field.nearest.nearest(location.x, location.y)
+        if nearest is None:
+            return location
+        width = self.karbonite_field.width
+        return bc.MapLocation(location.planet, nearest[0] % width, nearest[0] // width)
@@ -0,0 +1,69 @@
+import math
+from typing import Dict, Iterable, List, Tuple
+from UnitSnapshot import UnitRecord
+
+
+def radius_of(radius_squared: int) -> int:
+    return int(math.ceil(math.sqrt(radius_squared)))
+
+
+class SpatialHash:
+    """
+    Units bucketed by position on a uniform grid, built once per round from the unit snapshot instead of asking the
+    engine to sense around every soldier. The buckets are as large as the largest attack range of the units seen,
+    so an attack range query only looks at the 3x3 buckets around its center.
+    Positions are the ones at build time, our own moves during the turn are not re-bucketed.
+    """
+
+    def __init__(self, units: Iterable[UnitRecord], cell_size: int) -> None:
+        self.cell_size = max(1, cell_size)  # type: int
+        self.buckets = dict()  # type: Dict[Tuple[int, int], List[UnitRecord]]
+        for unit in units:
+            if unit.is_on_map:
+                self.buckets.setdefault((unit.x // self.cell_size, unit.y // self.cell_size), []).append(unit)
+
+    @staticmethod
+    def build(units: List[UnitRecord], largest_range_of: Iterable[UnitRecord]) -> 'SpatialHash':
+        largest_range = max((unit.attack_range for unit in largest_range_of), default=1)
+        return SpatialHash(units, radius_of(largest_range))
+
+    def remove(self, unit: UnitRecord) -> None:
+        bucket = self.buckets.get((unit.x // self.cell_size, unit.y // self.cell_size))
+        if bucket is not None and unit in bucket:
+            bucket.remove(unit)
+
+    def candidates(self, bucket_x: int, bucket_y: int, span: int) -> List[UnitRecord]:
+        found = []
+        for by in range(bucket_y - span, bucket_y + span + 1):
+            for bx in range(bucket_x - span, bucket_x + span + 1):
+                bucket = self.buckets.get((bx, by))
+                if bucket is not None:
+                    found.extend(bucket)
+        return found
+
+    def within(self, x: int, y: int, radius_squared: int) -> List[UnitRecord]:
+        span = -(-radius_of(radius_squared) // self.cell_size)
+        return [unit for unit in self.candidates(x // self.cell_size, y // self.cell_size, span)
+                if (unit.x - x) ** 2 + (unit.y - y) ** 2 <= radius_squared]
+
+    def within_each(self, centers: Iterable[UnitRecord]) -> List[Tuple[UnitRecord, List[UnitRecord]]]:
+        """
+        All units within the attack range of every center, for the centers that have any. The candidates of a bucket
+        are gathered once and shared by all the centers in it.
+        """
+        by_bucket = dict()  # type: Dict[Tuple[int, int], List[UnitRecord]]
+        for center in centers:
+            if center.is_on_map:
+                by_bucket.setdefault((center.x // self.cell_size, center.y // self.cell_size), []).append(center)
+        result = []
+        for (bucket_x, bucket_y), group in by_bucket.items():
+            span = -(-radius_of(max(center.attack_range for center in group)) // self.cell_size)
+            candidates = self.candidates(bucket_x, bucket_y, span)
+            if not candidates:
+                continue
+            for center in group:
+                x, y, radius_squared = center.x, center.y, center.attack_range
+                found = [unit for unit in candidates if (unit.x - x) ** 2 + (unit.y - y) ** 2 <= radius_squared]
+                if found:
+                    result.append((center, found))
+        return result
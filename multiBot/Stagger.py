@@ -0,0 +1,58 @@
+from typing import Dict, Iterable
+from UnitSnapshot import UnitRecord
+
+# A unit can move or attack while the heat is below the limit, the heat drops by HEAT_PER_ROUND every round
+HEAT_LIMIT = 10
+HEAT_PER_ROUND = 10
+# Idle units are served again within this many rounds, an equal share of them every round
+IDLE_PERIOD = 3
+
+
+def rounds_until_ready(heat: int) -> int:
+    if heat < HEAT_LIMIT:
+        return 0
+    return (heat - HEAT_LIMIT) // HEAT_PER_ROUND + 1
+
+
+def is_move_ready(unit: UnitRecord) -> bool:
+    """
+    Whether the unit could move at the start of the round, without asking the engine.
+    A unit that moved since may still be refused by gc.is_move_ready.
+    """
+    return unit.movement_heat < HEAT_LIMIT
+
+
+def is_attack_ready(unit: UnitRecord) -> bool:
+    return unit.attack_heat < HEAT_LIMIT
+
+
+class UnitStagger:
+    """
+    Remembers the next round each unit is worth serving in. A unit on cooldown sleeps until its heat lets it act,
+    an idle unit sleeps until its slot of the idle period, so the idle units are re-planned over several rounds
+    instead of all of them every round.
+    """
+
+    def __init__(self, idle_period: int = IDLE_PERIOD) -> None:
+        self.idle_period = idle_period  # type: int
+        self.wake_round = dict()  # type: Dict[int, int]
+
+    def is_due(self, unit: UnitRecord, current_round: int, heat: int) -> bool:
+        """
+        Whether the unit should be served this round, heat is the one its work waits for.
+        """
+        if self.wake_round.get(unit.id, current_round) > current_round:
+            return False
+        rounds = rounds_until_ready(heat)
+        if rounds > 0:
+            self.wake_round[unit.id] = current_round + rounds
+            return False
+        return True
+
+    def idle(self, unit_id: int, current_round: int) -> None:
+        # Next round whose number matches the unit's id modulo the period, which spreads the units evenly
+        self.wake_round[unit_id] = current_round + 1 + (unit_id - current_round - 1) % self.idle_period
+
+    def prune(self, alive_ids: Iterable[int]) -> None:
+        alive_ids = set(alive_ids)
+        self.wake_round = {unit_id: wake for unit_id, wake in self.wake_round.items() if unit_id in alive_ids}
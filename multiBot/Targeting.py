@@ -0,0 +1,89 @@
+import battlecode as bc
+from typing import Dict, List, Tuple
+from UnitSnapshot import UnitRecord
+
+
+def expected_damage(attacker: UnitRecord, target: UnitRecord) -> int:
+    """
+    Health the target loses to one attack, knights take the damage reduced by their defense.
+    Mage splash on the units around the target is not counted.
+    """
+    if target.unit_type == bc.UnitType.Knight:
+        return max(0, attacker.damage - target.defense)
+    return attacker.damage
+
+
+def can_hit(attacker: UnitRecord, target: UnitRecord) -> bool:
+    distance = (attacker.x - target.x) ** 2 + (attacker.y - target.y) ** 2
+    # Only rangers cannot attack units that are too close, the engine reports a cannot_attack_range for every type
+    if attacker.unit_type == bc.UnitType.Ranger and distance <= attacker.cannot_attack_range:
+        return False
+    return distance <= attacker.attack_range
+
+
+def plan_attacks(engagements):
+    # type: (List[Tuple[UnitRecord, List[UnitRecord]]]) -> List[Tuple[UnitRecord, UnitRecord, int]]
+    """
+    Focus fire for all the ready attackers with the enemies in their range, returns (attacker, target, damage) orders.
+    The enemy that dies with the fewest free attackers is killed first, with the hardest hitting attackers, so no
+    attack is spent on a unit already dead this turn. The attackers that cannot finish anything wear down the
+    weakest enemy they reach. The predicted health of every enemy is updated as the attacks are assigned.
+    """
+    options = dict()  # type: Dict[int, List[UnitRecord]]
+    attackers = dict()  # type: Dict[int, UnitRecord]
+    attackers_of = dict()  # type: Dict[int, List[UnitRecord]]
+    enemies = dict()  # type: Dict[int, UnitRecord]
+    health = dict()  # type: Dict[int, int]
+    for attacker, targets in engagements:
+        reachable = [target for target in targets if can_hit(attacker, target) and expected_damage(attacker, target) > 0]
+        if not reachable:
+            continue
+        options[attacker.id] = reachable
+        attackers[attacker.id] = attacker
+        for target in reachable:
+            enemies[target.id] = target
+            health[target.id] = target.health
+            attackers_of.setdefault(target.id, []).append(attacker)
+
+    orders = []
+    free = set(attackers)
+    while free:
+        best = None
+        for target_id, target_health in health.items():
+            if target_health <= 0:
+                continue
+            target = enemies[target_id]
+            shooters = [attacker for attacker in attackers_of[target_id] if attacker.id in free]
+            # Hardest hitting first, among equals the ones with fewer other targets
+            shooters.sort(key=lambda a: (-expected_damage(a, target), len(options[a.id])))
+            needed = []
+            remaining = target_health
+            for shooter in shooters:
+                if remaining <= 0:
+                    break
+                needed.append(shooter)
+                remaining -= expected_damage(shooter, target)
+            if remaining > 0:
+                continue
+            # Fewest attackers first, then the more dangerous and the weaker enemy
+            key = (len(needed), -target.damage, target_health)
+            if best is None or key < best[0]:
+                best = (key, target, needed)
+        if best is None:
+            break
+        _, target, needed = best
+        for shooter in needed:
+            damage = expected_damage(shooter, target)
+            orders.append((shooter, target, damage))
+            health[target.id] -= damage
+            free.discard(shooter.id)
+
+    for attacker_id in sorted(free, key=lambda a: len(options[a])):
+        attacker = attackers[attacker_id]
+        alive = [target for target in options[attacker_id] if health[target.id] > 0]
+        if alive:
+            target = min(alive, key=lambda t: health[t.id])
+            damage = expected_damage(attacker, target)
+            orders.append((attacker, target, damage))
+            health[target.id] -= damage
+    return orders
@@ -0,0 +1,79 @@
+import time
+from enum import IntEnum
+from typing import Callable, List
+
+# Every turn adds this much to the time pool
+TURN_INCREMENT_MS = 50
+# On top of the increment a turn may spend this share of the rest of the pool
+POOL_SHARE = 1 / 50
+# Never plan to spend the last milliseconds of the pool
+RESERVE_MS = 20
+# Weight of the newest measurement in a task's cost estimate
+COST_SMOOTHING = 0.3
+
+
+class Priority(IntEnum):
+    # Keeps the managers' state consistent, always runs
+    BOOKKEEPING = 0
+    COMBAT = 1
+    BUILDERS = 2
+    MINERS = 3
+    EXPLORATION = 4
+
+
+class Task:
+    def __init__(self, name: str, priority: Priority, function: Callable[[], None]) -> None:
+        self.name = name  # type: str
+        self.priority = priority  # type: Priority
+        self.function = function  # type: Callable[[], None]
+        # Smoothed cost in milliseconds, None until the task ran once
+        self.cost_ms = None  # type: float
+
+
+class TurnScheduler:
+    """
+    Runs the managers' work as prioritized tasks within a per-turn time slice derived from the time pool.
+    Tasks run from the highest priority down, a task whose estimated cost no longer fits the rest of the slice
+    is deferred to a later turn. Low priority work starves first instead of the player timing out.
+    """
+
+    def __init__(self) -> None:
+        self.tasks = []  # type: List[Task]
+        self.turn_started = 0.0  # type: float
+        self.slice_ms = 0.0  # type: float
+
+    def add(self, name: str, priority: Priority, function: Callable[[], None]) -> None:
+        self.tasks.append(Task(name, priority, function))
+        # Stable, so tasks of the same priority keep the order they were added in
+        self.tasks.sort(key=lambda task: task.priority)
+
+    @staticmethod
+    def turn_slice(time_left_ms: int) -> float:
+        return max(0, min(time_left_ms - RESERVE_MS,
+                          TURN_INCREMENT_MS + (time_left_ms - TURN_INCREMENT_MS) * POOL_SHARE))
+
+    def remaining_ms(self) -> float:
+        return self.slice_ms - (time.time() - self.turn_started) * 1000
+
+    def run(self, time_left_ms: int) -> List[str]:
+        """
+        Runs one turn, returns the names of the deferred tasks.
+        """
+        self.turn_started = time.time()
+        self.slice_ms = self.turn_slice(time_left_ms)
+        deferred = []
+        for task in self.tasks:
+            if (task.priority != Priority.BOOKKEEPING and task.cost_ms is not None
+                    and task.cost_ms > self.remaining_ms()):
+                # Forget a one-off spike slowly, so the task gets another try once the estimate fits again
+                task.cost_ms *= 1 - COST_SMOOTHING
+                deferred.append(task.name)
+                continue
+            started = time.time()
+            task.function()
+            elapsed = (time.time() - started) * 1000
+            if task.cost_ms is None:
+                task.cost_ms = elapsed
+            else:
+                task.cost_ms += COST_SMOOTHING * (elapsed - task.cost_ms)
+        return deferred
@@ -1,36 +1,78 @@
 import battlecode as bc
+from typing import Dict, List, Tuple
 
-from LocationUtil import find_empty_loc_near
-from Pathfinder import a_star_search
+from CooperativePlanner import plan_cooperative_moves
+from FlowField import flow_fields, downhill_step
+from Grid import OFFSET_TO_DIRECTION
+from MapCache import get_grid, get_hierarchy
+from Occupancy import move_robot
+from GridSearch import grid_a_star
+from PathCache import path_cache
+from Pathfinder import search_budget
+from Stagger import is_move_ready
+from UnitSnapshot import UnitRecord
 
 
-def navigate_unit_to(gc: bc.GameController, unit: bc.Unit, target_location: bc.MapLocation) -> bool:
+def navigate_unit_to(gc: bc.GameController, unit: UnitRecord, target_location: bc.MapLocation,
+                     search=grid_a_star) -> bool:
     # print(f'navigating to {target_location}')
-    unit_location = unit.location.map_location()
-    if unit_location.is_adjacent_to(target_location):
+    if unit.is_adjacent_to(target_location):
         # print('Unit is adjacent to target location.')
         return True
-    else:
-        # Worker is too far, move it closer
-        # print('Unit is too far, move it closer')
-        loc_near = find_empty_loc_near(gc, gc.starting_map(bc.Planet.Earth), target_location)
-        if loc_near is not None:
-            # print(f'Try to move unit from {unit.location.map_location()} to {loc_near}')
-            a_star_result = a_star_search(
-                gc,
-                gc.starting_map(bc.Planet.Earth),
-                unit_location,
-                target_location
-            )
-            if a_star_result is None:
-                path_to_loc = None
-            else:
-                path_to_loc = list(a_star_result)
-            if path_to_loc is not None and len(path_to_loc) > 1:
-                # print(f'Path found {path_to_loc}')
-                next_node = path_to_loc[1]
-                next_dir = unit_location.direction_to(bc.MapLocation(gc.planet(), next_node[0], next_node[1]))
-                if gc.can_move(unit.id, next_dir) and gc.is_move_ready(unit.id):
-                    # print(f'Unit {unit.id} move to {next_node}')
-                    gc.move_robot(unit.id, next_dir)
-        return False
+    elif is_move_ready(unit) and gc.is_move_ready(unit.id):
+        # Unit is too far, step down the shared distance field of the target
+        grid = get_grid(gc, gc.planet())
+        start = (unit.x, unit.y)
+        goal = (target_location.x, target_location.y)
+        next_node = None
+        if not path_cache.has_path(unit.id, goal):
+            next_node = downhill_step(grid, flow_fields.field(grid, goal), start)
+        if next_node is None:
+            # All closer cells are occupied, follow a cached way around the blocking units
+            next_node = path_cache.next_step(grid, unit.id, start, goal, gc.round(), search, search_budget(gc))
+        if next_node is not None:
+            # print(f'Unit {unit.id} move to {next_node}')
+            next_dir = bc.Direction(OFFSET_TO_DIRECTION[(next_node[0] - start[0], next_node[1] - start[1])])
+            if gc.can_move(unit.id, next_dir):
+                move_robot(gc, unit.id, next_dir)
+    return False
+
+
+def navigate_unit_far(gc: bc.GameController, unit: UnitRecord, target_location: bc.MapLocation) -> bool:
+    """
+    Moves the unit towards a target only it is heading to, like a random exploration point.
+    The route is planned over the map clusters so no distance field of the whole map is built for the one target.
+    """
+    if unit.is_adjacent_to(target_location):
+        return True
+    elif is_move_ready(unit) and gc.is_move_ready(unit.id):
+        hierarchy = get_hierarchy(gc, gc.planet())
+        start = (unit.x, unit.y)
+        next_node = hierarchy.first_step(start, (target_location.x, target_location.y))
+        if next_node is None:
+            return navigate_unit_to(gc, unit, target_location)
+        next_dir = bc.Direction(OFFSET_TO_DIRECTION[(next_node[0] - start[0], next_node[1] - start[1])])
+        if gc.can_move(unit.id, next_dir):
+            move_robot(gc, unit.id, next_dir)
+    return False
+
+
+def navigate_units_to(gc: bc.GameController, orders: List[Tuple[UnitRecord, bc.MapLocation]]) -> Dict[int, bool]:
+    """
+    Moves all the units of the orders towards their targets with one cooperative plan, so they do not walk
+    into each other. Returns for every unit whether it is already adjacent to its target.
+    """
+    arrived = dict()
+    requests = []
+    for unit, target_location in orders:
+        arrived[unit.id] = unit.is_adjacent_to(target_location)
+        if not arrived[unit.id] and is_move_ready(unit) and gc.is_move_ready(unit.id):
+            requests.append((unit.id, (unit.x, unit.y), (target_location.x, target_location.y)))
+
+    grid = get_grid(gc, gc.planet())
+    for unit_id, start, next_node in plan_cooperative_moves(grid, requests):
+        if next_node is not None:
+            next_dir = bc.Direction(OFFSET_TO_DIRECTION[(next_node[0] - start[0], next_node[1] - start[1])])
+            if gc.can_move(unit_id, next_dir):
+                move_robot(gc, unit_id, next_dir)
+    return arrived
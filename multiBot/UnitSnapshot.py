@@ -0,0 +1,148 @@
+import battlecode as bc
+import json
+from typing import Dict, List
+
+
+class UnitRecord:
+    """
+    Plain Python copy of a bc.Unit, decoded from a single to_json call instead of an FFI call per property.
+    Fields a unit type does not use hold the engine's defaults, e.g. attack_range is 0 for structures.
+    """
+    __slots__ = ['id', 'team', 'unit_type', 'planet', 'x', 'y', 'is_on_map', 'is_in_garrison', 'health', 'max_health',
+                 'movement_heat', 'attack_heat', 'ability_heat', 'attack_range', 'cannot_attack_range', 'damage',
+                 'defense', 'vision_range', 'harvest_amount', 'garrison', 'is_built', 'is_used']
+
+    def __init__(self, data: dict) -> None:
+        self.id = data['id']  # type: int
+        self.team = bc.Team[data['team']]  # type: bc.Team
+        self.unit_type = bc.UnitType[data['unit_type']]  # type: bc.UnitType
+        self.health = data['health']  # type: int
+        self.max_health = data['max_health']  # type: int
+        self.movement_heat = data['movement_heat']  # type: int
+        self.attack_heat = data['attack_heat']  # type: int
+        self.ability_heat = data['ability_heat']  # type: int
+        self.attack_range = data['attack_range']  # type: int
+        self.cannot_attack_range = data['cannot_attack_range']  # type: int
+        self.damage = data['damage']  # type: int
+        self.defense = data['defense']  # type: int
+        self.vision_range = data['vision_range']  # type: int
+        self.harvest_amount = data['harvest_amount']  # type: int
+        self.garrison = list(data['garrison'])  # type: List[int]
+        self.is_built = data['is_built']  # type: bool
+        self.is_used = data['is_used']  # type: bool
+        self.planet = None  # type: bc.Planet
+        self.x = None  # type: int
+        self.y = None  # type: int
+        self.is_on_map = False  # type: bool
+        self.is_in_garrison = False  # type: bool
+        location = data['location']
+        if isinstance(location, dict) and 'OnMap' in location:
+            self.set_position(bc.Planet[location['OnMap']['planet']], location['OnMap']['x'], location['OnMap']['y'])
+        elif isinstance(location, dict) and 'InGarrison' in location:
+            self.is_in_garrison = True
+
+    @staticmethod
+    def from_unit(unit: bc.Unit) -> 'UnitRecord':
+        return UnitRecord(json.loads(unit.to_json()))
+
+    def set_position(self, planet: bc.Planet, x: int, y: int) -> None:
+        self.planet = planet
+        self.x = x
+        self.y = y
+        self.is_on_map = True
+        self.is_in_garrison = False
+
+    def leave_map(self, is_in_garrison: bool) -> None:
+        self.x = None
+        self.y = None
+        self.is_on_map = False
+        self.is_in_garrison = is_in_garrison
+
+    def map_location(self) -> bc.MapLocation:
+        return bc.MapLocation(self.planet, self.x, self.y)
+
+    def distance_squared_to(self, location: bc.MapLocation) -> int:
+        return (self.x - location.x) ** 2 + (self.y - location.y) ** 2
+
+    def is_adjacent_to(self, location: bc.MapLocation) -> bool:
+        # Like bc.MapLocation.is_adjacent_to, a square is not adjacent to itself or to squares on the other planet
+        return self.planet is location.planet and 0 < self.distance_squared_to(location) <= 2
+
+
+class UnitSnapshot:
+    """
+    All the units we can see, decoded once per round and shared by both managers.
+    Our own moves, loads, unloads and new units update the records in place, see Occupancy.
+    """
+
+    def __init__(self) -> None:
+        self.round = None  # type: int
+        self.team = None  # type: bc.Team
+        self.units = dict()  # type: Dict[int, UnitRecord]
+
+    def refresh(self, gc: bc.GameController) -> None:
+        current_round = gc.round()
+        if self.round != current_round:
+            self.round = current_round
+            self.team = gc.team()
+            self.units = {record.id: record for record in map(UnitRecord.from_unit, gc.units())}
+
+    def my_units(self) -> List[UnitRecord]:
+        return [unit for unit in self.units.values() if unit.team == self.team]
+
+    def unit(self, unit_id: int) -> UnitRecord:
+        """
+        Raises KeyError for units that are dead or cannot be seen, like gc.unit raises for them.
+        """
+        return self.units[unit_id]
+
+    def add(self, unit: bc.Unit) -> UnitRecord:
+        record = UnitRecord.from_unit(unit)
+        self.units[record.id] = record
+        return record
+
+    def move(self, unit_id: int, dx: int, dy: int) -> None:
+        if unit_id in self.units:
+            record = self.units[unit_id]
+            record.set_position(record.planet, record.x + dx, record.y + dy)
+
+    def load(self, structure_id: int, robot_id: int) -> None:
+        if robot_id in self.units:
+            self.units[robot_id].leave_map(True)
+        if structure_id in self.units:
+            self.units[structure_id].garrison.append(robot_id)
+
+    def unload(self, structure_id: int, unit: bc.Unit) -> None:
+        record = self.add(unit)
+        if structure_id in self.units and record.id in self.units[structure_id].garrison:
+            self.units[structure_id].garrison.remove(record.id)
+
+    def damage(self, unit_id: int, amount: int) -> bool:
+        """
+        Lowers the unit's health by our attack, a unit that dies is dropped. Returns whether it died.
+        """
+        if unit_id not in self.units:
+            return False
+        record = self.units[unit_id]
+        record.health -= amount
+        if record.health <= 0:
+            del self.units[unit_id]
+            return True
+        return False
+
+    def launch(self, rocket_id: int) -> None:
+        if rocket_id in self.units:
+            rocket = self.units[rocket_id]
+            rocket.leave_map(False)
+            rocket.is_used = True
+
+
+snapshot = UnitSnapshot()
+
+
+def unit_snapshot(gc: bc.GameController) -> UnitSnapshot:
+    """
+    Returns the shared snapshot, decoded again when a new round started.
+    """
+    snapshot.refresh(gc)
+    return snapshot
@@ -0,0 +1,90 @@
+"""
+Measures the cost of one call of the hot GameController methods with the checked and the fast bindings,
+see battlecode.set_fast_mode. Runs a local manager on the engine's test map, no players or sockets needed.
+
+    python3 benchmark_binding.py [calls per method]
+
+The queries are repeated over the robots of the map. A robot can only move once before it cools down,
+so move_robot is timed on a fresh manager for every repetition.
+"""
+import sys
+import time
+
+import battlecode as bc
+
+ROBOT_TYPES = [bc.UnitType.Worker, bc.UnitType.Knight, bc.UnitType.Ranger, bc.UnitType.Mage, bc.UnitType.Healer]
+MOVE_REPETITIONS = 200
+
+
+def new_game():  # type: () -> bc.GameController
+    return bc.GameController.new_manager(bc.GameMap.test_map())
+
+
+def robot_ids(gc):  # type: (bc.GameController) -> list
+    return [unit.id for unit in gc.my_units() if unit.unit_type in ROBOT_TYPES]
+
+
+def time_queries(gc, calls):  # type: (bc.GameController, int) -> dict
+    robots = robot_ids(gc)
+    directions = list(bc.Direction)
+    rounds = max(1, calls // len(robots))
+    results = dict()
+
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for robot_id in robots:
+            gc.is_move_ready(robot_id)
+    results['is_move_ready'] = (time.perf_counter() - started) / (rounds * len(robots))
+
+    started = time.perf_counter()
+    for i in range(rounds):
+        direction = directions[i % len(directions)]
+        for robot_id in robots:
+            gc.can_move(robot_id, direction)
+    results['can_move'] = (time.perf_counter() - started) / (rounds * len(robots))
+    return results
+
+
+def time_moves():  # type: () -> float
+    elapsed = 0
+    moves = 0
+    for _ in range(MOVE_REPETITIONS):
+        gc = new_game()
+        orders = []
+        for robot_id in robot_ids(gc):
+            for direction in bc.Direction:
+                if gc.can_move(robot_id, direction):
+                    orders.append((robot_id, direction))
+                    break
+        started = time.perf_counter()
+        for robot_id, direction in orders:
+            gc.move_robot(robot_id, direction)
+        elapsed += time.perf_counter() - started
+        moves += len(orders)
+    return elapsed / max(1, moves)
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    gc = new_game()
+    if not robot_ids(gc):
+        print('The test map has no robots to benchmark with')
+        return
+
+    timings = dict()
+    for fast in [False, True]:
+        bc.set_fast_mode(fast)
+        results = time_queries(gc, calls)
+        results['move_robot'] = time_moves()
+        timings[fast] = results
+    bc.set_fast_mode(False)
+
+    print('{:<16}{:>12}{:>12}{:>10}'.format('method', 'checked us', 'fast us', 'speedup'))
+    for name in ['is_move_ready', 'can_move', 'move_robot']:
+        checked = timings[False][name] * 1e6
+        fast = timings[True][name] * 1e6
+        print('{:<16}{:>12.3f}{:>12.3f}{:>9.2f}x'.format(name, checked, fast, checked / fast if fast else 0))
+
+
+if __name__ == '__main__':
+    main()
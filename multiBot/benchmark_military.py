@@ -0,0 +1,119 @@
+"""
+Measures how the military manager's bookkeeping scales with the size of the army. Runs on synthetic units put
+straight into the unit snapshot, no engine game or map needed.
+
+    python3 benchmark_military.py [rounds]
+
+Every round a share of the soldiers dies and is replaced by new ones, the dead soldier removal and the whole
+update_state are timed, then soldiers are moved between random groups. The legacy column is the dead soldier
+removal as it was before, scanning lists.
+The invariants of the groups are checked after every round, outside the timings.
+"""
+import random
+import sys
+import time
+
+import battlecode as bc
+from MilitaryManager import MilitaryManager
+from UnitSnapshot import UnitRecord, snapshot
+
+ARMY_SIZES = [25, 50, 100, 200]
+DEATHS_PER_ROUND = 0.05
+MOVES_PER_ROUND = 0.1
+MAP_SIZE = 50
+SOLDIER_TYPES = ['Ranger', 'Ranger', 'Knight', 'Mage', 'Healer']
+
+
+class SyntheticGame:
+    # Just what the manager asks the controller for outside of the snapshot
+    def __init__(self) -> None:
+        self.current_round = 1
+
+    def round(self) -> int:
+        return self.current_round
+
+    def team(self) -> bc.Team:
+        return bc.Team.Red
+
+    def planet(self) -> bc.Planet:
+        return bc.Planet.Earth
+
+
+def synthetic_unit(unit_id, team, unit_type):  # type: (int, str, str) -> UnitRecord
+    return UnitRecord({
+        'id': unit_id, 'team': team, 'unit_type': unit_type, 'health': 200, 'max_health': 200,
+        'movement_heat': 0, 'attack_heat': 0, 'ability_heat': 0, 'attack_range': 50, 'cannot_attack_range': 10,
+        'damage': 30, 'defense': 0, 'vision_range': 70, 'harvest_amount': 0, 'garrison': [], 'is_built': True,
+        'is_used': False, 'location': {'OnMap': {'planet': 'Earth', 'x': random.randrange(MAP_SIZE),
+                                                 'y': random.randrange(MAP_SIZE)}}})
+
+
+def legacy_remove_dead_soldiers(groups, my_units):  # type: (dict, list) -> dict
+    my_unit_ids = [u.id for u in my_units]
+    return {k: {t: [x for x in v if x in my_unit_ids] for t, v in soldiers.items()} for k, soldiers in groups.items()}
+
+
+def run_army(size, rounds):  # type: (int, int) -> dict
+    random.seed(size)
+    game = SyntheticGame()
+    snapshot.round = game.round()
+    snapshot.team = game.team()
+    snapshot.units = dict()
+    next_id = 1
+    for _ in range(size):
+        for team in ['Red', 'Blue']:
+            snapshot.units[next_id] = synthetic_unit(next_id, team, random.choice(SOLDIER_TYPES))
+            next_id += 1
+    manager = MilitaryManager(game, None)
+    results = {'remove': 0.0, 'legacy': 0.0, 'update': 0.0, 'move': 0.0, 'moves': 0}
+
+    for _ in range(rounds):
+        game.current_round += 1
+        snapshot.round = game.round()
+        mine = snapshot.my_units()
+        for unit in random.sample(mine, int(len(mine) * DEATHS_PER_ROUND)):
+            del snapshot.units[unit.id]
+            snapshot.units[next_id] = synthetic_unit(next_id, 'Red', random.choice(SOLDIER_TYPES))
+            next_id += 1
+
+        legacy_groups = {group_id: {t: list(v) for t, v in group.soldiers.items()}
+                         for group_id, group in manager.groups.items()}
+        started = time.perf_counter()
+        legacy_remove_dead_soldiers(legacy_groups, snapshot.my_units())
+        results['legacy'] += time.perf_counter() - started
+
+        started = time.perf_counter()
+        manager.remove_dead_soldiers()
+        results['remove'] += time.perf_counter() - started
+
+        started = time.perf_counter()
+        manager.update_state()
+        results['update'] += time.perf_counter() - started
+
+        soldiers = list(manager.soldiers_group)
+        group_ids = list(manager.groups)
+        moves = [(random.choice(soldiers), random.choice(group_ids))
+                 for _ in range(int(len(soldiers) * MOVES_PER_ROUND))]
+        started = time.perf_counter()
+        for soldier_id, group_id in moves:
+            # An earlier move may have disbanded the group
+            if group_id in manager.groups:
+                manager.move_soldier(soldier_id, group_id)
+        results['move'] += time.perf_counter() - started
+        results['moves'] += len(moves)
+        manager.check_invariants()
+    return results
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    print('{:>6}{:>12}{:>12}{:>12}{:>10}'.format('army', 'remove us', 'legacy us', 'update us', 'move us'))
+    for size in ARMY_SIZES:
+        results = run_army(size, rounds)
+        print('{:>6}{:>12.1f}{:>12.1f}{:>12.1f}{:>10.3f}'.format(
+            size, results['remove'] / rounds * 1e6, results['legacy'] / rounds * 1e6,
+            results['update'] / rounds * 1e6, results['move'] / max(1, results['moves']) * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+"""
+Compares the number of cells expanded by the grid searches on every map in battlecode-maps.
+Runs without the engine, the maps are read straight from the .bc18map (JSON) and .bc18t (text) files.
+
+    python3 benchmark_pathfinding.py [--reachable] [maps directory] [pairs per map]
+
+With --reachable only pairs with a path between them are searched, otherwise every search of an unreachable
+goal floods the whole component of the start.
+"""
+import heapq
+import json
+import math
+import os
+import random
+import re
+import sys
+import time
+
+from FlowField import distance_field, UNREACHABLE
+from Grid import Grid
+from GridSearch import grid_a_star
+from Landmarks import LandmarkTable
+
+
+def legacy_a_star(grid, start, goal, stats):
+    # The search as it was before: Euclidean heuristic, no closed set and duplicate heap entries
+    neighbours = grid.neighbours
+    occupied = grid.occupied
+    start_idx = grid.index(start[0], start[1])
+    goal_idx = grid.index(goal[0], goal[1])
+    if not grid.is_free(goal[0], goal[1]):
+        return None
+    frontier = []
+    came_from = {start_idx: None}
+    cost_so_far = {start_idx: 0}
+    expanded = 0
+    heapq.heappush(frontier, (0, start_idx))
+    while frontier:
+        current = heapq.heappop(frontier)[1]
+        expanded += 1
+        if current == goal_idx:
+            break
+        new_cost = cost_so_far[current] + 1
+        for nxt in neighbours[current]:
+            if occupied[nxt]:
+                continue
+            if nxt not in cost_so_far or new_cost < cost_so_far[nxt]:
+                cost_so_far[nxt] = new_cost
+                x, y = grid.coords(nxt)
+                heapq.heappush(frontier, (new_cost + math.sqrt((x - goal[0]) ** 2 + (y - goal[1]) ** 2), nxt))
+                came_from[nxt] = current
+    stats['expanded'] = expanded
+    return goal_idx in came_from
+
+
+def load_json_map(path):
+    game_map = json.load(open(path))
+    return [(planet, game_map[key]['width'], game_map[key]['height'], game_map[key]['is_passable_terrain'])
+            for planet, key in [('Earth', 'earth_map'), ('Mars', 'mars_map')]]
+
+
+def load_text_map(path):
+    # Cells missing from the text are filled from their symmetric counterpart or left passable
+    planets = []
+    walls = set()
+    current = None
+    for line in open(path):
+        line = line.split('#')[0].rstrip()
+        if line.strip() in ['EARTH:', 'MARS:']:
+            current = {'name': line.strip()[:-1].capitalize(), 'rows': [], 'symmetry': 'none'}
+            planets.append(current)
+            continue
+        setting = re.match(r'\s*(width|height|symmetry)\s*:\s*(\S+)', line)
+        definition = re.match(r'\s*(\S)\s*=(.*)', line)
+        if current is not None and setting:
+            current[setting.group(1)] = setting.group(2)
+        elif definition:
+            if 'impassable' in definition.group(2):
+                walls.add(definition.group(1))
+        elif current is not None and line.startswith('>'):
+            current['rows'].append(line[1:].replace(' ', ''))
+
+    result = []
+    for planet in planets:
+        width, height = int(planet['width']), int(planet['height'])
+        cells = [[None] * width for _ in range(height)]
+        for y, row in enumerate(planet['rows'][:height]):
+            for x, symbol in enumerate(row[:width]):
+                cells[y][x] = symbol not in walls
+        for y in range(height):
+            for x in range(width):
+                if cells[y][x] is None:
+                    mirror_x = width - 1 - x if planet['symmetry'] in ['horizontal', 'spiral'] else x
+                    mirror_y = height - 1 - y if planet['symmetry'] in ['vertical', 'spiral'] else y
+                    mirrored = cells[mirror_y][mirror_x]
+                    cells[y][x] = True if mirrored is None else mirrored
+        result.append((planet['name'], width, height, cells))
+    return result
+
+
+def build_grid(width, height, cells):
+    passable = bytearray(width * height)
+    for y in range(height):
+        for x in range(width):
+            if cells[y][x]:
+                passable[y * width + x] = 1
+    return Grid(width, height, passable)
+
+
+def run_search(search, grid, pairs):
+    expanded = 0
+    start_time = time.time()
+    for start, goal in pairs:
+        stats = dict()
+        search(grid, start, goal, stats)
+        expanded += stats.get('expanded', 0)
+    return expanded, (time.time() - start_time) * 1000
+
+
+def main():
+    reachable_only = '--reachable' in sys.argv
+    args = [a for a in sys.argv[1:] if a != '--reachable']
+    maps_dir = args[0] if len(args) > 0 else os.path.join('..', 'battlecode-maps')
+    pair_count = int(args[1]) if len(args) > 1 else 50
+    print(f'{"map":32} {"legacy":>9} {"ms":>7} {"a_star":>9} {"ms":>7} {"alt":>9} {"ms":>7}')
+    totals = [0] * 6
+    for file_name in sorted(os.listdir(maps_dir)):
+        path = os.path.join(maps_dir, file_name)
+        if file_name.endswith('.bc18map'):
+            planets = load_json_map(path)
+        elif file_name.endswith('.bc18t'):
+            planets = load_text_map(path)
+        else:
+            continue
+        for planet, width, height, cells in planets:
+            grid = build_grid(width, height, cells)
+            cells_list = [grid.coords(i) for i in range(width * height) if grid.passable[i]]
+            if len(cells_list) < 2:
+                continue
+            rng = random.Random(file_name + planet)
+            pairs = [tuple(rng.sample(cells_list, 2)) for _ in range(pair_count)]
+            if reachable_only:
+                pairs = [(start, goal) for start, goal in pairs
+                         if distance_field(grid, goal)[grid.index(start[0], start[1])] != UNREACHABLE]
+
+            row = list(run_search(legacy_a_star, grid, pairs))
+            row += run_search(grid_a_star, grid, pairs)
+            grid.landmarks = LandmarkTable(grid)
+            while grid.landmarks.add_landmark():
+                pass
+            row += run_search(grid_a_star, grid, pairs)
+            totals = [t + r for t, r in zip(totals, row)]
+            print(f'{file_name + " " + planet:32} {row[0]:9} {row[1]:7.1f} {row[2]:9} {row[3]:7.1f} '
+                  f'{row[4]:9} {row[5]:7.1f}')
+    print(f'{"total":32} {totals[0]:9} {totals[1]:7.1f} {totals[2]:9} {totals[3]:7.1f} '
+          f'{totals[4]:9} {totals[5]:7.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -4,8 +4,10 @@ import sys
 import traceback
 import time
 from Pathfinder import a_star_search
+from MapCache import precompute_landmarks
 from ProductionManager import ProductionManager
 from MilitaryManager import MilitaryManager
+from TurnScheduler import TurnScheduler, Priority
 
 import os
 print(os.getcwd())
@@ -16,6 +18,8 @@ print("pystarting")
 # Its constructor will connect to a running game.
 gc = bc.GameController()
 directions = list(bc.Direction)
+# Free the engine objects we dropped during a turn all at once when the turn is sent
+bc.set_turn_arena(True)
 
 print("pystarted")
 
@@ -61,8 +65,27 @@ turn_number = 0
 
 production_manager = ProductionManager(gc)
 military_manager = MilitaryManager(gc, production_manager)
-bet_time = 0
-end_time = 0
+landmarks_ready = False
+# Longest slice of one turn spent on the landmark tables
+LANDMARKS_MS = 20
+
+
+def precompute_landmarks_step():
+    # Spread the landmark precomputation over the turns that have time to spare
+    global landmarks_ready
+    if not landmarks_ready:
+        landmarks_ready = precompute_landmarks(gc, min(LANDMARKS_MS, scheduler.remaining_ms()))
+
+
+scheduler = TurnScheduler()
+scheduler.add('production state', Priority.BOOKKEEPING, production_manager.update_state)
+scheduler.add('military state', Priority.BOOKKEEPING, military_manager.update_state)
+scheduler.add('combat', Priority.COMBAT, military_manager.fight)
+scheduler.add('production', Priority.BUILDERS, production_manager.manage_production)
+scheduler.add('builders', Priority.BUILDERS, production_manager.manage_builders)
+scheduler.add('miners', Priority.MINERS, production_manager.manage_miners)
+scheduler.add('exploration', Priority.EXPLORATION, military_manager.explore)
+scheduler.add('landmarks', Priority.EXPLORATION, precompute_landmarks_step)
 
 while True:
     turn_number += 1
@@ -70,16 +93,9 @@ while True:
     print(f'Turn {turn_number} started')
     print('-----------------------------')
 
-    start = time.time()
-    if gc.get_time_left_ms() > 300:
-        production_manager.update()
-        bet_time += time.time() - start
-        print("between: ", bet_time )
-    if gc.get_time_left_ms() > 150:
-        start = time.time()
-        military_manager.update()
-        end_time += time.time() - start
-        print("End: ", end_time)
+    deferred = scheduler.run(gc.get_time_left_ms())
+    if deferred:
+        print(f'Deferred: {deferred}')
 
     gc.next_turn()
     sys.stdout.flush()
@@ -1,5 +1,10 @@
 #!/bin/sh
 export "PYTHONPATH=../battlecode/python:$PYTHONPATH"
+
+# With this variable set, the engine skips the type asserts of the hot GameController methods and checks for
+# errors only when a can_* or is_*_ready call answers false, see benchmark_binding.py for the difference.
+#export BC_FAST_BINDINGS=1
+
 python3 run.py
 
 # If you set the following flag, the engine won't run type asserts.
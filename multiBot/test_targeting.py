@@ -0,0 +1,88 @@
+import unittest
+
+import battlecode as bc
+from MilitaryManager import MilitaryManager
+from Targeting import can_hit, plan_attacks
+from UnitSnapshot import UnitRecord, snapshot
+
+
+def record(unit_id, team, unit_type, x, y, attack_range, damage, health=200, defense=0):
+    # type: (int, str, str, int, int, int, int, int, int) -> UnitRecord
+    # The engine reports a cannot_attack_range of 10 for every unit type
+    return UnitRecord({
+        'id': unit_id, 'team': team, 'unit_type': unit_type, 'health': health, 'max_health': health,
+        'movement_heat': 0, 'attack_heat': 0, 'ability_heat': 0, 'attack_range': attack_range,
+        'cannot_attack_range': 10, 'damage': damage, 'defense': defense, 'vision_range': 50, 'harvest_amount': 0,
+        'garrison': [], 'is_built': True, 'is_used': False, 'location': {'OnMap': {'planet': 'Earth', 'x': x, 'y': y}}})
+
+
+class HeatedGame:
+    # Just what fight_with_soldier asks the controller for, every soldier is still cooling down
+    def round(self) -> int:
+        return 1
+
+    def team(self) -> bc.Team:
+        return bc.Team.Red
+
+    def is_attack_ready(self, unit_id: int) -> bool:
+        return False
+
+
+def manager_with(units):  # type: (list) -> MilitaryManager
+    game = HeatedGame()
+    snapshot.round = game.round()
+    snapshot.team = game.team()
+    snapshot.units = {unit.id: unit for unit in units}
+    manager = MilitaryManager(game, None)
+    manager.index_units()
+    return manager
+
+
+class TestTargeting(unittest.TestCase):
+    def test_knight_hits_adjacent_enemy(self):
+        knight = record(1, 'Red', 'Knight', 5, 5, 2, 60)
+        enemy = record(2, 'Blue', 'Worker', 6, 6, 0, 0, health=100)
+        self.assertTrue(can_hit(knight, enemy))
+        self.assertEqual(plan_attacks([(knight, [enemy])]), [(knight, enemy, 60)])
+
+    def test_mage_hits_close_enemy(self):
+        mage = record(1, 'Red', 'Mage', 5, 5, 30, 60)
+        enemy = record(2, 'Blue', 'Ranger', 7, 6, 50, 30)
+        self.assertTrue(can_hit(mage, enemy))
+        self.assertEqual(plan_attacks([(mage, [enemy])]), [(mage, enemy, 60)])
+
+    def test_ranger_cannot_hit_close_enemy(self):
+        ranger = record(1, 'Red', 'Ranger', 5, 5, 50, 30)
+        close = record(2, 'Blue', 'Worker', 7, 6, 0, 0)
+        far = record(3, 'Blue', 'Worker', 10, 5, 0, 0)
+        self.assertFalse(can_hit(ranger, close))
+        self.assertEqual(plan_attacks([(ranger, [close, far])]), [(ranger, far, 30)])
+
+    def test_ranger_with_only_too_close_enemy_moves_on(self):
+        ranger = record(1, 'Red', 'Ranger', 5, 5, 50, 30)
+        knight = record(2, 'Blue', 'Knight', 6, 5, 2, 60, defense=5)
+        self.assertEqual(plan_attacks([(ranger, [knight])]), [])
+        self.assertFalse(manager_with([ranger, knight]).fight_with_soldier(ranger.id))
+
+    def test_ranger_holds_with_enemy_to_hit(self):
+        ranger = record(1, 'Red', 'Ranger', 5, 5, 50, 30)
+        knight = record(2, 'Blue', 'Knight', 6, 5, 2, 60, defense=5)
+        far = record(3, 'Blue', 'Worker', 10, 5, 0, 0)
+        self.assertTrue(manager_with([ranger, knight, far]).fight_with_soldier(ranger.id))
+
+    def test_knight_defense_reduces_damage(self):
+        ranger = record(1, 'Red', 'Ranger', 0, 0, 50, 30)
+        knight = record(2, 'Blue', 'Knight', 5, 0, 2, 60, defense=5)
+        self.assertEqual(plan_attacks([(ranger, [knight])]), [(ranger, knight, 25)])
+
+    def test_kills_before_spreading_damage(self):
+        rangers = [record(i, 'Red', 'Ranger', 0, i, 50, 30) for i in range(1, 4)]
+        weak = record(10, 'Blue', 'Worker', 5, 0, 0, 0, health=60)
+        strong = record(11, 'Blue', 'Worker', 5, 2, 0, 0, health=200)
+        orders = plan_attacks([(ranger, [strong, weak]) for ranger in rangers])
+        self.assertEqual(len(orders), 3)
+        self.assertEqual(sum(1 for _, target, _ in orders if target is weak), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()